@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import struct
+import zlib
+from http_client import Response
+
+_LENGTH = struct.Struct('>I')
+
+
+class ResponseArchive:
+    """
+    Compressed, append-only archive of fetched pages.
+
+    Each record is a 4-byte length followed by a zlib-compressed JSON header
+    line (url, status, headers) and the raw body. Records are only ever
+    appended and flushed one at a time. A torn record left by a crash is
+    ignored when reading and cut off before the next run appends, so several
+    runs can be recorded into the same file. The latest record for a URL
+    wins on replay.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+        self._index = None
+        self.records = 0
+
+    def append(self, url, status, headers, body):
+        if self._writer is None:
+            self._writer = self._open_for_append()
+        meta = json.dumps({'url': url, 'status': status, 'headers': dict(headers)}).encode('utf-8')
+        payload = zlib.compress(meta + b'\n' + body)
+        self._writer.write(_LENGTH.pack(len(payload)) + payload)
+        # A crash can then tear at most the record being written
+        self._writer.flush()
+        self.records += 1
+
+    def _open_for_append(self):
+        end = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                for _, end in self._scan(f):
+                    pass
+        writer = open(self.path, 'ab')
+        # Cut a torn record left by a crash, so new records start on a record boundary
+        if os.path.getsize(self.path) > end:
+            logging.warning(f"Dropping a truncated record at the end of {self.path}")
+            writer.truncate(end)
+        return writer
+
+    @staticmethod
+    def _scan(f):
+        """(payload, end offset) of each complete record of `f`, up to the first torn one."""
+        while True:
+            header = f.read(_LENGTH.size)
+            if len(header) < _LENGTH.size:
+                return
+            length, = _LENGTH.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield payload, f.tell()
+
+    def _load_index(self):
+        index = {}
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"No response archive at {self.path}")
+        with open(self.path, 'rb') as f:
+            end = 0
+            for payload, end in self._scan(f):
+                meta, _ = zlib.decompress(payload).split(b'\n', 1)
+                index[json.loads(meta)['url']] = payload
+            if os.path.getsize(self.path) > end:
+                logging.warning(f"Ignoring truncated record at the end of {self.path}")
+        logging.info(f"Loaded {len(index)} archived pages from {self.path}")
+        return index
+
+    def get(self, url):
+        """The archived Response for `url`, or None if it was never recorded."""
+        if self._index is None:
+            self._index = self._load_index()
+        payload = self._index.get(url)
+        if payload is None:
+            return None
+        meta, body = zlib.decompress(payload).split(b'\n', 1)
+        meta = json.loads(meta)
+        return Response(meta['status'], meta['headers'], body)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class ReplayClient:
+    """
+    Drop-in for CrawlerClient that serves every page from a ResponseArchive,
+    with no network, rate limiting or retries, so the pipeline runs as fast
+    as parsing and writing allow.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.requests = 0
+        self.misses = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        logging.info(f"Replay client: {self}")
+
+    async def get(self, url, headers=None) -> Response:
+        self.requests += 1
+        response = self.archive.get(url)
+        if response is None:
+            self.misses += 1
+            raise LookupError(f"{url} is not in the response archive")
+        return response
+
+    def __str__(self):
+        return f"requests={self.requests} misses={self.misses}"
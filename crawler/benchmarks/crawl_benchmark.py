@@ -0,0 +1,206 @@
+"""
+End-to-end crawler benchmark.
+
+Starts the local Glovo stand-in server, runs fast_crawler.scrape_store_location
+for each store against it and writes into SQLite (a fresh temporary file by
+default) or the PostgreSQL database given with --database-uri. Reports
+pages/s, products/s, DB statements per product, peak RSS and p50/p99 latency
+per pipeline stage.
+
+    python benchmarks/crawl_benchmark.py --pages 200 --latency 0.05 --json run.json
+    python benchmarks/crawl_benchmark.py --pages 200 --latency 0.05 --baseline run.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.standin_server import CatalogConfig, start_server
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+class PeakRSS:
+    """Samples resident memory of this process and its parse workers."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+
+    def sample(self):
+        if psutil is None:
+            import resource
+            # ru_maxrss is already a peak, in KiB on Linux
+            self.peak = max(self.peak, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+            return
+        process = psutil.Process()
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        self.peak = max(self.peak, rss)
+
+    async def run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+
+async def run_benchmark(args, fast_crawler, statements):
+    catalog = CatalogConfig(args.pages, args.grids, args.tiles, args.latency, args.jitter)
+    runner, base_url = await start_server(catalog)
+    fast_crawler.BASE_URL = base_url
+    fast_crawler.configure_parsing(args.parse_processes, args.parser)
+    fast_crawler.dimension_cache.load()
+
+    pipeline_config = fast_crawler.PipelineConfig(
+        fetch_workers=args.fetch_workers,
+        parse_workers=args.parse_workers,
+        write_workers=args.write_workers,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+    )
+    rate_limiter = fast_crawler.RateLimiter(fast_crawler.RateLimitConfig(
+        rate=args.rate, max_rate=args.rate, burst=args.fetch_workers, concurrency=args.host_concurrency
+    ))
+    client_config = fast_crawler.ClientConfig(connections_per_host=args.host_concurrency)
+
+    rss = PeakRSS()
+    sampler = asyncio.create_task(rss.run())
+    statements[0] = 0
+    start = time.perf_counter()
+    try:
+        async with fast_crawler.CrawlerClient(client_config, rate_limiter) as client:
+            results = await asyncio.gather(*(
+                fast_crawler.scrape_store_location(store, 'Roma', client, pipeline_config)
+                for store in args.stores
+            ))
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+        rss.sample()
+        if fast_crawler.parse_executor is not None:
+            fast_crawler.parse_executor.shutdown()
+        await runner.cleanup()
+
+    results = [stats for stats in results if stats is not None]
+    pages = sum(stats.pages for stats in results)
+    products = sum(stats.products for stats in results)
+    stages = {}
+    for name in ('fetch', 'parse', 'write'):
+        timings = [t for stats in results for t in stats.timings.get(name, [])]
+        stages[name] = {
+            'p50_ms': percentile(timings, 0.50) * 1000,
+            'p99_ms': percentile(timings, 0.99) * 1000,
+            'count': len(timings),
+        }
+    return {
+        'stores': len(args.stores),
+        'pages': pages,
+        'products': products,
+        'errors': sum(sum(stats.errors.values()) for stats in results),
+        'seconds': elapsed,
+        'pages_per_s': pages / elapsed,
+        'products_per_s': products / elapsed,
+        'statements': statements[0],
+        'statements_per_product': statements[0] / products if products else 0.0,
+        'peak_rss_mb': rss.peak / 2 ** 20,
+        'stages': stages,
+    }
+
+
+def report(result, baseline=None):
+    def line(label, key, fmt, better='higher'):
+        value = result[key]
+        text = f"{label:24s} {value:{fmt}}"
+        if baseline and baseline.get(key):
+            change = (value - baseline[key]) / baseline[key] * 100
+            text += f"   ({change:+.1f}% vs baseline, {better} is better)"
+        print(text)
+
+    print(f"{result['stores']} stores, {result['pages']} pages, {result['products']} products, "
+          f"{result['errors']} errors in {result['seconds']:.2f}s")
+    line('pages/s', 'pages_per_s', '10.1f')
+    line('products/s', 'products_per_s', '10.0f')
+    line('DB statements/product', 'statements_per_product', '10.4f', 'lower')
+    line('peak RSS (MiB)', 'peak_rss_mb', '10.1f', 'lower')
+    for name, stage in result['stages'].items():
+        print(f"{name + ' p50/p99 (ms)':24s} {stage['p50_ms']:10.1f} / {stage['p99_ms']:.1f}   n={stage['count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crawler against a local Glovo stand-in")
+    parser.add_argument("--stores", nargs="+", default=["penny", "conad"], help="Store names to crawl")
+    parser.add_argument("--pages", type=int, default=100, help="Subcategory pages per store")
+    parser.add_argument("--grids", type=int, default=3, help="Grids per page")
+    parser.add_argument("--tiles", type=int, default=40, help="Products per grid")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mean server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform jitter on the latency")
+    parser.add_argument("--database-uri", help="Write target (default: a fresh temporary SQLite file)")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Requests/s allowed against the stand-in")
+    parser.add_argument("--host-concurrency", type=int, default=20, help="In-flight requests")
+    parser.add_argument("--fetch-workers", type=int, default=10)
+    parser.add_argument("--parse-workers", type=int, default=4)
+    parser.add_argument("--write-workers", type=int, default=1)
+    parser.add_argument("--queue-size", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--parse-processes", type=int, default=os.cpu_count())
+    parser.add_argument("--parser", default="auto", help="Parser backend (auto, selectolax, lxml, html.parser)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare against results saved with --json")
+    args = parser.parse_args()
+
+    # Keep the crawler's own log file out of benchmark runs
+    logging.basicConfig(level=logging.WARNING)
+    tmpdir = None
+    if args.database_uri:
+        os.environ['DATABASE_URI'] = args.database_uri
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    # fast_crawler binds its engine to DATABASE_URI at import time
+    import fast_crawler
+    from sqlalchemy import event
+
+    statements = [0]
+
+    @event.listens_for(fast_crawler.engine, 'before_cursor_execute')
+    def count_statement(*_):
+        statements[0] += 1
+
+    result = asyncio.run(run_benchmark(args, fast_crawler, statements))
+    fast_crawler.engine.dispose()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(result, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
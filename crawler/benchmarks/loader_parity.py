@@ -0,0 +1,130 @@
+"""
+Checks that CopyLoader (--bulk-load) leaves PostgreSQL in the same state as
+BulkWriter.
+
+Writes the same synthetic batches with each writer into an emptied schema:
+new products, changed and unchanged prices, duplicate tiles within a batch
+and the same products in several stores. Then compares products, latest
+prices, price history and the write counts. Every table of the crawler's
+schema is emptied, so point it at a scratch database:
+
+    python benchmarks/loader_parity.py --database-uri postgresql+psycopg2://localhost/parity
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsing
+from benchmarks import synthetic
+
+
+def batches(pages, stores, location):
+    """(store, location, products) batches over two rounds, the second with changed prices."""
+    import fast_crawler
+    rounds = []
+    for round_seed in (0, 1):
+        for store in stores:
+            products = []
+            for page_id in range(pages):
+                # Half the pages keep their prices in the second round
+                seed = page_id + (1000 * round_seed if page_id % 2 else 0)
+                link = f"https://glovoapp.com/it/it/{location.lower()}/{store}/page-{page_id}"
+                records = parsing.parse_product_page(synthetic.product_page(page_id, seed=seed))
+                products += fast_crawler.build_products(records, link)
+            # The same tiles twice with other prices: the later ones win
+            link = f"https://glovoapp.com/it/it/{location.lower()}/{store}/page-0"
+            records = parsing.parse_product_page(synthetic.product_page(0, seed=7 + round_seed))
+            products += fast_crawler.build_products(records, link)
+            rounds.append((store, location, products))
+    return rounds
+
+
+def snapshot(conn):
+    from sqlalchemy import text
+    return {
+        'products': conn.execute(text(
+            "SELECT p.name, sc.name, c.name, p.link, p.image_url FROM products p"
+            " JOIN sub_categories sc ON sc.sub_category_id = p.sub_category_id"
+            " JOIN categories c ON c.category_id = sc.category_id"
+            " ORDER BY 1, 2, 3"
+        )).all(),
+        'prices': conn.execute(text(
+            "SELECT p.name, sc.name, s.name, l.city, pp.price, pp.last_updated FROM product_prices pp"
+            " JOIN products p ON p.product_id = pp.product_id"
+            " JOIN sub_categories sc ON sc.sub_category_id = p.sub_category_id"
+            " JOIN stores s ON s.store_id = pp.store_id"
+            " JOIN locations l ON l.location_id = pp.location_id"
+            " ORDER BY 1, 2, 3, 4"
+        )).all(),
+        # valid_from is the write time, which differs between the two runs
+        'history': conn.execute(text(
+            "SELECT p.name, sc.name, s.name, l.city, h.price, count(*) FROM price_history h"
+            " JOIN products p ON p.product_id = h.product_id"
+            " JOIN sub_categories sc ON sc.sub_category_id = p.sub_category_id"
+            " JOIN stores s ON s.store_id = h.store_id"
+            " JOIN locations l ON l.location_id = h.location_id"
+            " GROUP BY 1, 2, 3, 4, 5 ORDER BY 1, 2, 3, 4, 5"
+        )).all(),
+    }
+
+
+def run(writer_class, work):
+    import fast_crawler
+    from bulk_writer import WriteStats
+    from dimension_cache import DimensionCache
+    engine, metadata = fast_crawler.engine, fast_crawler.Base.metadata
+    with engine.begin() as conn:
+        for table in reversed(metadata.sorted_tables):
+            conn.execute(table.delete())
+    writer = writer_class(engine, metadata, DimensionCache(engine, metadata))
+    stats = WriteStats()
+    for store, location, products in work:
+        stats += writer.write_batch(products, store, location)
+    with engine.connect() as conn:
+        return stats, snapshot(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CopyLoader's end state with BulkWriter's")
+    parser.add_argument("--database-uri", required=True, help="Scratch PostgreSQL database (psycopg2)")
+    parser.add_argument("--stores", nargs="+", default=["penny", "conad"], help="Stores sharing the same products")
+    parser.add_argument("--pages", type=int, default=20, help="Subcategory pages per store and round")
+    args = parser.parse_args()
+    if not args.database_uri.startswith('postgresql+psycopg2://'):
+        parser.error("--database-uri must be a postgresql+psycopg2:// URI")
+
+    # Keep the crawler's own log file out of the check
+    logging.basicConfig(level=logging.WARNING)
+    os.environ['DATABASE_URI'] = args.database_uri
+    # fast_crawler binds its engine to DATABASE_URI at import time
+    import fast_crawler
+    from bulk_writer import BulkWriter
+    from copy_loader import CopyLoader
+
+    work = batches(args.pages, args.stores, 'Roma')
+    expected_stats, expected = run(BulkWriter, work)
+    actual_stats, actual = run(CopyLoader, work)
+    fast_crawler.engine.dispose()
+
+    failures = 0
+    for name in ('inserted', 'updated', 'unchanged', 'skipped'):
+        if getattr(expected_stats, name) != getattr(actual_stats, name):
+            print(f"{name}: BulkWriter {getattr(expected_stats, name)}, CopyLoader {getattr(actual_stats, name)}")
+            failures += 1
+    for table, rows in expected.items():
+        missing = sorted(set(rows) - set(actual[table]))
+        extra = sorted(set(actual[table]) - set(rows))
+        print(f"{table}: {len(rows)} rows, {len(missing)} only with BulkWriter, {len(extra)} only with CopyLoader")
+        for row in (missing + extra)[:10]:
+            print(f"  {row}")
+        failures += bool(missing or extra)
+    print(f"BulkWriter: {expected_stats}")
+    print(f"CopyLoader: {actual_stats}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
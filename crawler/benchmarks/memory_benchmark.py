@@ -0,0 +1,86 @@
+"""
+Memory benchmark for scraped product records.
+
+Parses synthetic subcategory pages once, ships the parsed tuples through
+pickle as the parse worker processes do, then measures with tracemalloc how
+many bytes each product costs when the pages are held as per-tile dicts
+(the old format) and as ProductRecords:
+
+    python benchmarks/memory_benchmark.py --pages 200
+"""
+import argparse
+import gc
+import os
+import pickle
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsing
+from benchmarks import synthetic
+from records import ProductRecord
+
+
+def as_dicts(records, link, category):
+    return [
+        {
+            'link': link,
+            'sub_category': sub_category_name,
+            'category': category,
+            'name': product_name,
+            'price': product_price,
+            'image_url': image_url
+        }
+        for sub_category_name, product_name, product_price, image_url in records
+    ]
+
+
+def as_records(records, link, category):
+    return [
+        ProductRecord(link, sub_category_name, category, product_name, product_price, image_url)
+        for sub_category_name, product_name, product_price, image_url in records
+    ]
+
+
+def measure(build, payloads):
+    """Bytes still allocated after building every page with `build`, and the product count."""
+    gc.collect()
+    tracemalloc.start()
+    pages = []
+    for i, payload in enumerate(payloads):
+        # Every page arrives as a fresh unpickled copy, like results from the process pool
+        records = pickle.loads(payload)
+        pages.append(build(records, f"https://glovoapp.com/it/it/roma/store/sub/{i}", 'Category'))
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, sum(len(page) for page in pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per scraped product: dicts vs ProductRecords")
+    parser.add_argument("--pages", type=int, default=100, help="Synthetic subcategory pages")
+    parser.add_argument("--grids", type=int, default=3, help="Grids per page")
+    parser.add_argument("--tiles", type=int, default=40, help="Products per grid")
+    args = parser.parse_args()
+
+    backend = parsing.resolve_backend('auto')
+    payloads = [
+        pickle.dumps(parsing.parse_product_page(
+            synthetic.product_page(i, args.grids, args.tiles, seed=i).encode('utf-8'), backend
+        ))
+        for i in range(args.pages)
+    ]
+
+    results = {}
+    for name, build in (('dict', as_dicts), ('ProductRecord', as_records)):
+        size, products = measure(build, payloads)
+        results[name] = size / products
+        print(f"{name:14s} {products} products  {size / 2 ** 20:8.2f} MiB  {size / products:7.1f} bytes/product")
+    saved = 1 - results['ProductRecord'] / results['dict']
+    print(f"ProductRecord saves {saved:.0%} per product")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Parse microbenchmark for the crawler's HTML parser backends.
+
+Times every installed backend on saved Glovo subcategory pages and checks that
+they all produce identical records:
+
+    python benchmarks/parse_benchmark.py --pages saved_pages/
+
+Without --pages it runs on synthetic pages from benchmarks/synthetic.py.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsing
+from benchmarks import synthetic
+
+
+def load_pages(pages_dir, count):
+    if pages_dir:
+        paths = sorted(glob.glob(os.path.join(pages_dir, '*.html')))
+        if not paths:
+            sys.exit(f"No .html files in {pages_dir}")
+        pages = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        return pages
+    return [synthetic.product_page(i).encode('utf-8') for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends")
+    parser.add_argument("--pages", help="Directory of saved subcategory pages (*.html)")
+    parser.add_argument("--count", type=int, default=50, help="Synthetic pages when --pages is not given")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per backend")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.count)
+    total_bytes = sum(len(page) for page in pages)
+    print(f"{len(pages)} pages, {total_bytes / 1024:.0f} KiB")
+
+    reference = None
+    baseline = None
+    for backend in reversed(parsing.available_backends()):
+        records = [parsing.parse_product_page(page, backend) for page in pages]
+        if reference is None:
+            reference = records
+        elif records != reference:
+            print(f"{backend:12s} OUTPUT DIFFERS from html.parser")
+            continue
+
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for page in pages:
+                parsing.parse_product_page(page, backend)
+            best = min(best, time.perf_counter() - start)
+
+        if baseline is None:
+            baseline = best
+        products = sum(len(r) for r in records)
+        print(
+            f"{backend:12s} {len(pages) / best:8.1f} pages/s  {products / best:10.0f} products/s  "
+            f"{total_bytes / best / 1e6:6.1f} MB/s  x{baseline / best:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
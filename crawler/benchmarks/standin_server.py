@@ -0,0 +1,94 @@
+"""
+Local stand-in for Glovo's store pages.
+
+Serves a landing page per store with `--pages` subcategory links, and
+subcategory pages of `--grids` x `--tiles` products in Glovo's
+carousel__content__element / grid / tile markup, after a configurable
+latency. Product names are shared across stores and prices differ, like the
+real catalogs. Pages support ETag revalidation.
+
+    python benchmarks/standin_server.py --port 8080 --pages 200 --latency 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import sys
+from dataclasses import dataclass
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import synthetic
+
+
+@dataclass
+class CatalogConfig:
+    pages: int = 100              # subcategory pages per store
+    grids: int = 3                # grids per page
+    tiles: int = 40               # products per grid
+    latency: float = 0.0          # mean response delay, seconds
+    jitter: float = 0.0           # +/- uniform jitter on the delay
+
+
+def create_app(config):
+    rng = random.Random(0)
+
+    async def delay():
+        if config.latency or config.jitter:
+            await asyncio.sleep(max(0.0, config.latency + rng.uniform(-config.jitter, config.jitter)))
+
+    async def landing(request):
+        await delay()
+        store = request.match_info['store']
+        links = [f'/sub/{store}/{i}' for i in range(config.pages)]
+        return web.Response(body=synthetic.landing_page(links).encode('utf-8'), content_type='text/html')
+
+    async def subcategory(request):
+        await delay()
+        store = request.match_info['store']
+        page_id = int(request.match_info['page'])
+        if page_id >= config.pages:
+            raise web.HTTPNotFound()
+        body = synthetic.product_page(
+            page_id, config.grids, config.tiles, seed=f"{store}-{page_id}"
+        ).encode('utf-8')
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=body, content_type='text/html', headers={'ETag': etag})
+
+    app = web.Application()
+    app.router.add_get('/it/it/{city}/{store}-{abbr}/', landing)
+    app.router.add_get('/sub/{store}/{page}', subcategory)
+    return app
+
+
+async def start_server(config, host='127.0.0.1', port=0):
+    """Start the stand-in in the running loop; returns (runner, base_url)."""
+    runner = web.AppRunner(create_app(config), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic Glovo store pages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pages", type=int, default=100, help="Subcategory pages per store")
+    parser.add_argument("--grids", type=int, default=3, help="Grids per page")
+    parser.add_argument("--tiles", type=int, default=40, help="Products per grid")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform jitter on the delay")
+    args = parser.parse_args()
+
+    config = CatalogConfig(args.pages, args.grids, args.tiles, args.latency, args.jitter)
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
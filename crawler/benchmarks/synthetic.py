@@ -0,0 +1,35 @@
+"""Synthetic pages shaped like Glovo's store markup, for offline benchmarks."""
+import random
+
+SUB_CATEGORIES = [
+    "Birre", "Acqua naturale", "Latte intero", "Prosciutto crudo", "Pasta secca",
+    "Biscotti", "Detersivi lavatrice", "Frutta fresca", "Verdura fresca", "Yogurt da bere",
+]
+
+
+def landing_page(links):
+    elements = ''.join(
+        f'<div class="carousel__content__element"><a href="{link}"><span>Categoria</span></a></div>'
+        for link in links
+    )
+    return f'<html><body><div class="carousel"><div class="carousel__content">{elements}</div></div></body></html>'
+
+
+def product_page(page_id, grids=3, tiles_per_grid=40, seed=None):
+    rng = random.Random(seed if seed is not None else page_id)
+    sections = []
+    for g in range(grids):
+        tiles = []
+        for t in range(tiles_per_grid):
+            cents = rng.randint(20, 2500)
+            tiles.append(
+                '<div class="tile"><div class="tile__body">'
+                f'<img class="tile__image" src="https://images.example/{page_id}/{g}/{t}.jpg" alt=""/>'
+                f'<span class="tile__description"> Prodotto {page_id}-{g}-{t} 500 g - {t} </span>'
+                '<div class="product-price">'
+                f'<span class="product-price__effective">{cents // 100},{cents % 100:02d} €</span>'
+                '</div></div></div>'
+            )
+        title = SUB_CATEGORIES[(page_id + g) % len(SUB_CATEGORIES)]
+        sections.append(f'<div class="grid"><h2 class="grid__title">{title}</h2>{"".join(tiles)}</div>')
+    return f'<html><head><title>Glovo</title></head><body>{"".join(sections)}</body></html>'
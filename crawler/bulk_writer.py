@@ -0,0 +1,201 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, time
+from sqlalchemy import DateTime, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Rows per INSERT ... ON CONFLICT statement. Keeps us well below the bound
+# parameter limits of both SQLite and PostgreSQL.
+CHUNK_SIZE = 500
+
+
+@dataclass
+class WriteStats:
+    """Outcome of one or more bulk writes."""
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    statements: int = 0
+
+    def __iadd__(self, other):
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.skipped += other.skipped
+        self.statements += other.statements
+        return self
+
+    def __str__(self):
+        return (
+            f"inserted={self.inserted} updated={self.updated} "
+            f"unchanged={self.unchanged} skipped={self.skipped} "
+            f"statements={self.statements}"
+        )
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def dialect_insert(engine, table):
+    """Return an INSERT construct that supports ON CONFLICT for the engine's dialect."""
+    if engine.dialect.name == 'postgresql':
+        return postgresql.insert(table)
+    if engine.dialect.name == 'sqlite':
+        return sqlite.insert(table)
+    raise ValueError(f"Unsupported dialect {engine.dialect.name}")
+
+
+class BulkWriter:
+    """
+    Writes a whole store/location batch of scraped products with a handful of
+    set-based INSERT ... ON CONFLICT statements, in one transaction per batch.
+
+    Products are upserted against `_product_uc` (name, sub_category_id) and
+    prices against `_price_uc` (product_id, store_id, location_id). Dimension
+    ids come from a shared DimensionCache, so they cost no statements here.
+
+    Only new and changed prices are written: each one updates the latest
+    price in `product_prices` and appends a row to `price_history`.
+    `last_updated` is when a price was last seen, kept to the day: an
+    unchanged price is rewritten at most once a day to move it.
+    """
+
+    def __init__(self, engine, metadata, dimensions, chunk_size=CHUNK_SIZE):
+        self.engine = engine
+        self.dimensions = dimensions
+        self.chunk_size = chunk_size
+        self.products = metadata.tables['products']
+        self.product_prices = metadata.tables['product_prices']
+        self.price_history = metadata.tables['price_history']
+
+    def _insert(self, table):
+        return dialect_insert(self.engine, table)
+
+    def write_batch(self, products, store_name, location_name) -> WriteStats:
+        stats = WriteStats()
+        rows = [p for p in products if p.price is not None]
+        stats.skipped = len(products) - len(rows)
+        if not rows:
+            return stats
+
+        store_id = self.dimensions.store_id(store_name)
+        location_id = self.dimensions.location_id(location_name)
+
+        # Collapse duplicates so a single statement never touches the same key twice
+        by_key = {}
+        for p in rows:
+            sub_category_id = self.dimensions.sub_category_id(p.sub_category, p.category)
+            by_key[(p.name, sub_category_id)] = p
+
+        # Concurrent writers share product rows across stores; taking their row
+        # locks in key order rather than page order keeps them from deadlocking
+        with self.engine.begin() as conn:
+            for chunk in chunked(sorted(by_key.items(), key=lambda item: item[0]), self.chunk_size):
+                self._write_chunk(conn, chunk, store_id, location_id, stats)
+
+        return stats
+
+    def _write_chunk(self, conn, chunk, store_id, location_id, stats):
+        products = self.products
+        prices = self.product_prices
+        now = datetime.utcnow()
+        # product_prices.last_updated is a DATE in some schemas and a TIMESTAMP in others
+        timestamps = isinstance(prices.c.last_updated.type, DateTime)
+        today = now if timestamps else now.date()
+        start_of_day = datetime.combine(now.date(), time.min) if timestamps else now.date()
+
+        # 1. Upsert products, only rewriting rows whose link or image changed
+        stmt = self._insert(products).values([
+            {
+                'name': name,
+                'sub_category_id': sub_category_id,
+                'link': p.link,
+                'image_url': p.image_url,
+            }
+            for (name, sub_category_id), p in chunk
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name', 'sub_category_id'],
+            set_={'link': stmt.excluded.link, 'image_url': stmt.excluded.image_url},
+            where=(
+                products.c.link.is_distinct_from(stmt.excluded.link)
+                | products.c.image_url.is_distinct_from(stmt.excluded.image_url)
+            ),
+        )
+        conn.execute(stmt)
+
+        # 2. Map (name, sub_category_id) back to product ids
+        keys = [key for key, _ in chunk]
+        product_ids = {
+            (name, sub_category_id): product_id
+            for product_id, name, sub_category_id in conn.execute(
+                select(products.c.product_id, products.c.name, products.c.sub_category_id)
+                .where(tuple_(products.c.name, products.c.sub_category_id).in_(keys))
+            )
+        }
+
+        # 3. Classify against the prices we already hold for this store/location
+        existing = dict(conn.execute(
+            select(prices.c.product_id, prices.c.price).where(
+                prices.c.store_id == store_id,
+                prices.c.location_id == location_id,
+                prices.c.product_id.in_(product_ids.values()),
+            )
+        ).all())
+        stats.statements += 3
+
+        changed = []
+        seen = []
+        for key, p in chunk:
+            product_id = product_ids[key]
+            if product_id not in existing:
+                stats.inserted += 1
+            elif existing[product_id] != p.price:
+                stats.updated += 1
+            else:
+                stats.unchanged += 1
+                seen.append(product_id)
+                continue
+            changed.append({
+                'product_id': product_id,
+                'store_id': store_id,
+                'location_id': location_id,
+                'price': p.price,
+            })
+
+        # 4. Unchanged prices were seen again: move last_updated, once a day
+        if seen:
+            conn.execute(
+                update(prices)
+                .where(
+                    prices.c.store_id == store_id,
+                    prices.c.location_id == location_id,
+                    prices.c.product_id.in_(seen),
+                    prices.c.last_updated < start_of_day,
+                )
+                .values(last_updated=today)
+            )
+            stats.statements += 1
+        if not changed:
+            return
+        changed.sort(key=lambda row: row['product_id'])
+
+        # 5. Upsert the latest price for new and changed products
+        stmt = self._insert(prices).values([dict(row, last_updated=today) for row in changed])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['product_id', 'store_id', 'location_id'],
+            set_={'price': stmt.excluded.price, 'last_updated': stmt.excluded.last_updated},
+        )
+        conn.execute(stmt)
+
+        # 6. Append the changes to the price history
+        stmt = self._insert(self.price_history).values([dict(row, valid_from=now) for row in changed])
+        conn.execute(stmt.on_conflict_do_nothing(
+            index_elements=['product_id', 'store_id', 'location_id', 'valid_from']
+        ))
+        stats.statements += 2
+
+        logging.debug(f"Wrote chunk of {len(chunk)} products: {stats}")
@@ -0,0 +1,34 @@
+import logging
+import time
+from sqlalchemy import text
+
+CATALOG_VIEW = 'product_catalog'
+
+# The web app's page cache keys on this cache_versions row
+BUMP_CATALOG_VERSION = """
+INSERT INTO cache_versions (name, version, updated_at) VALUES ('catalog', 1, now())
+ON CONFLICT (name) DO UPDATE SET version = cache_versions.version + 1, updated_at = excluded.updated_at
+"""
+
+
+def refresh_catalog(engine) -> bool:
+    """
+    Refresh the web app's product_catalog materialized view after new prices
+    are written. CONCURRENTLY keeps the home listing readable meanwhile.
+    Bumping the catalog version in the same transaction retires the web
+    app's cached pages.
+    Returns False where there is no view to refresh (SQLite, or the web
+    migrations have not been applied).
+    """
+    if engine.dialect.name != 'postgresql':
+        logging.debug(f"No catalog view on {engine.dialect.name}")
+        return False
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT to_regclass(:name)"), {'name': CATALOG_VIEW}).scalar() is None:
+            logging.warning(f"{CATALOG_VIEW} does not exist; apply the web app's migrations to create it")
+            return False
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {CATALOG_VIEW}"))
+        conn.execute(text(BUMP_CATALOG_VERSION))
+    logging.info(f"Refreshed {CATALOG_VIEW} in {time.perf_counter() - start:.1f}s")
+    return True
@@ -0,0 +1,103 @@
+import difflib
+import json
+import os
+import re
+import threading
+import unicodedata
+
+DEFAULT_MAPPING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_mapping.json')
+UNCATEGORIZED = ("Uncategorized", "Uncategorized")
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(name):
+    """Case-, accent-, punctuation- and whitespace-insensitive lookup key."""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    name = _PUNCTUATION.sub(' ', name.casefold())
+    return _SPACES.sub(' ', name).strip()
+
+
+def load_mapping(path=DEFAULT_MAPPING_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class CategoryIndex:
+    """
+    Glovo grid titles compiled into a hash index.
+
+    The nested {main category: {group: [grid titles]}} mapping is flattened
+    once into title -> (main category, group), keyed both verbatim and
+    normalized, so classifying is one or two dict lookups instead of a walk
+    over every list. Titles that still miss can fall back to the closest
+    known title (difflib ratio >= `cutoff`); fallback results, misses
+    included, are cached per normalized title.
+    """
+
+    def __init__(self, mapping, fuzzy=True, cutoff=0.85):
+        self.fuzzy = fuzzy
+        self.cutoff = cutoff
+        self._exact = {}
+        for main_category, groups in mapping.items():
+            if not isinstance(groups, dict):
+                groups = {None: groups}
+            for group, titles in groups.items():
+                for title in titles:
+                    # First occurrence wins, like the old linear scan
+                    self._exact.setdefault(title, (main_category, group))
+        self._index = {}
+        for title, result in self._exact.items():
+            self._index.setdefault(normalize(title), result)
+        self._keys = list(self._index)
+        self._fallback = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_MAPPING_PATH, **kwargs):
+        return cls(load_mapping(path), **kwargs)
+
+    def __len__(self):
+        return len(self._index)
+
+    def classify(self, name):
+        """(main category, group) for a grid title, or UNCATEGORIZED."""
+        result = self._exact.get(name)
+        if result is None:
+            key = normalize(name)
+            result = self._index.get(key)
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+            return result
+        with self._lock:
+            if key in self._fallback:
+                result = self._fallback[key]
+            else:
+                result = self._closest(key)
+                self._fallback[key] = result
+            if result is None:
+                self.misses += 1
+                return UNCATEGORIZED
+            self.fuzzy_hits += 1
+            return result
+
+    def classify_many(self, names):
+        """Classify a batch of titles; returns {title: (main category, group)}."""
+        return {name: self.classify(name) for name in set(names)}
+
+    def _closest(self, key):
+        if not self.fuzzy or not key:
+            return None
+        match = difflib.get_close_matches(key, self._keys, n=1, cutoff=self.cutoff)
+        return self._index[match[0]] if match else None
+
+    def __str__(self):
+        total = self.hits + self.fuzzy_hits + self.misses
+        return (f"titles={len(self)} lookups={total} hits={self.hits} "
+                f"fuzzy={self.fuzzy_hits} uncategorized={self.misses} cached_fallbacks={len(self._fallback)}")
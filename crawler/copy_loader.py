@@ -0,0 +1,140 @@
+import csv
+import io
+import logging
+from datetime import datetime, time
+from sqlalchemy import DateTime, text
+from bulk_writer import WriteStats
+
+STAGING_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS product_staging (
+    ord integer NOT NULL,
+    name text NOT NULL,
+    sub_category_id integer NOT NULL,
+    link text,
+    image_url text,
+    price double precision NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+
+COPY_SQL = (
+    "COPY product_staging (ord, name, sub_category_id, link, image_url, price) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+
+# Later records win on duplicate (name, sub_category_id), as in BulkWriter
+MERGE_PRODUCTS = """
+INSERT INTO products (name, sub_category_id, link, image_url)
+SELECT DISTINCT ON (name, sub_category_id) name, sub_category_id, link, image_url
+FROM product_staging
+ORDER BY name, sub_category_id, ord DESC
+ON CONFLICT (name, sub_category_id) DO UPDATE
+SET link = excluded.link, image_url = excluded.image_url
+WHERE (products.link, products.image_url) IS DISTINCT FROM (excluded.link, excluded.image_url)
+"""
+
+# product_prices and price_history in one statement; xmax = 0 marks freshly inserted rows
+MERGE_PRICES = """
+WITH latest AS (
+    SELECT DISTINCT ON (s.name, s.sub_category_id) p.product_id, s.price
+    FROM product_staging s
+    JOIN products p ON p.name = s.name AND p.sub_category_id = s.sub_category_id
+    ORDER BY s.name, s.sub_category_id, s.ord DESC
+), changed AS (
+    INSERT INTO product_prices (product_id, store_id, location_id, price, last_updated)
+    SELECT product_id, :store_id, :location_id, price, :last_updated FROM latest
+    ON CONFLICT (product_id, store_id, location_id) DO UPDATE
+    SET price = excluded.price, last_updated = excluded.last_updated
+    WHERE product_prices.price IS DISTINCT FROM excluded.price
+    RETURNING product_id, price, (xmax = 0) AS inserted
+), history AS (
+    INSERT INTO price_history (product_id, store_id, location_id, price, valid_from)
+    SELECT product_id, :store_id, :location_id, price, :valid_from FROM changed
+    ON CONFLICT (product_id, store_id, location_id, valid_from) DO NOTHING
+)
+SELECT
+    (SELECT count(*) FROM latest),
+    count(*) FILTER (WHERE inserted),
+    count(*) FILTER (WHERE NOT inserted)
+FROM changed
+"""
+
+# Unchanged prices were seen again: move last_updated, once a day, as in BulkWriter.
+# Changed rows already carry :last_updated, so only unchanged ones match.
+TOUCH_SEEN = """
+UPDATE product_prices pp
+SET last_updated = :last_updated
+FROM product_staging s
+JOIN products p ON p.name = s.name AND p.sub_category_id = s.sub_category_id
+WHERE pp.product_id = p.product_id
+  AND pp.store_id = :store_id
+  AND pp.location_id = :location_id
+  AND pp.last_updated < :start_of_day
+"""
+
+
+class CopyLoader:
+    """
+    Drop-in for BulkWriter for initial loads and full refreshes on PostgreSQL.
+
+    Each batch is streamed with COPY FROM STDIN into a temporary staging
+    table, then merged with one set-based statement into products and one
+    into product_prices and price_history, all in the batch's transaction.
+    The end state is the same as BulkWriter's: products upserted on
+    (name, sub_category_id), only new or changed prices written, and every
+    price change appended to the history. Larger batches (--batch-size)
+    make the most of it.
+    """
+
+    def __init__(self, engine, metadata, dimensions):
+        if engine.dialect.name != 'postgresql' or engine.dialect.driver != 'psycopg2':
+            raise ValueError(
+                f"COPY loading needs PostgreSQL through psycopg2, not {engine.dialect.name}+{engine.dialect.driver}"
+            )
+        self.engine = engine
+        self.dimensions = dimensions
+        # product_prices.last_updated is a DATE in some schemas and a TIMESTAMP in others
+        self.timestamp_prices = isinstance(metadata.tables['product_prices'].c.last_updated.type, DateTime)
+
+    def write_batch(self, products, store_name, location_name) -> WriteStats:
+        stats = WriteStats()
+        rows = [p for p in products if p.price is not None]
+        stats.skipped = len(products) - len(rows)
+        if not rows:
+            return stats
+
+        store_id = self.dimensions.store_id(store_name)
+        location_id = self.dimensions.location_id(location_name)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for position, p in enumerate(rows):
+            sub_category_id = self.dimensions.sub_category_id(p.sub_category, p.category)
+            writer.writerow((position, p.name, sub_category_id, p.link, p.image_url, repr(p.price)))
+        buffer.seek(0)
+
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            conn.execute(text(STAGING_DDL))
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.copy_expert(COPY_SQL, buffer)
+            finally:
+                cursor.close()
+            conn.execute(text(MERGE_PRODUCTS))
+            distinct, stats.inserted, stats.updated = conn.execute(text(MERGE_PRICES), {
+                'store_id': store_id,
+                'location_id': location_id,
+                'last_updated': now if self.timestamp_prices else now.date(),
+                'valid_from': now,
+            }).one()
+            conn.execute(text(TOUCH_SEEN), {
+                'store_id': store_id,
+                'location_id': location_id,
+                'last_updated': now if self.timestamp_prices else now.date(),
+                'start_of_day': datetime.combine(now.date(), time.min) if self.timestamp_prices else now.date(),
+            })
+        stats.unchanged = distinct - stats.inserted - stats.updated
+        stats.statements += 5
+
+        logging.debug(f"COPY-loaded {len(rows)} products for {store_name} in {location_name}: {stats}")
+        return stats
@@ -0,0 +1,154 @@
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import select
+from bulk_writer import dialect_insert
+
+# cache_versions row of the stores/locations/categories the web app caches for its filters
+REFERENCE_DATA = 'reference_data'
+
+
+def bump_version(conn, engine, versions, name):
+    """Increment cache_versions[name] in the caller's transaction, so readers drop their copies."""
+    now = datetime.utcnow()
+    insert = dialect_insert(engine, versions).values(name=name, version=1, updated_at=now)
+    conn.execute(insert.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': versions.c.version + 1, 'updated_at': now}
+    ))
+
+
+class DimensionCache:
+    """
+    Run-scoped cache of Store/Location/Category/SubCategory ids.
+
+    Loaded once at crawl start; a miss does a single get-or-create and keeps
+    the id for the rest of the run. Safe to share across executor threads.
+    Creating a store, location or category bumps the reference data version.
+    """
+
+    def __init__(self, engine, metadata):
+        self.engine = engine
+        self.stores = metadata.tables['stores']
+        self.locations = metadata.tables['locations']
+        self.categories = metadata.tables['categories']
+        self.sub_categories = metadata.tables['sub_categories']
+        self.versions = metadata.tables['cache_versions']
+        self._lock = threading.Lock()
+        self._store_ids = {}
+        self._location_ids = {}
+        self._category_ids = {}
+        self._sub_category_ids = {}
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+
+    def load(self):
+        """Fill the cache with every dimension row already in the database."""
+        with self.engine.connect() as conn:
+            store_ids = dict(conn.execute(
+                select(self.stores.c.name, self.stores.c.store_id)
+            ).all())
+            location_ids = dict(conn.execute(
+                select(self.locations.c.city, self.locations.c.location_id)
+                .order_by(self.locations.c.location_id.desc())
+            ).all())
+            category_ids = dict(conn.execute(
+                select(self.categories.c.name, self.categories.c.category_id)
+            ).all())
+            id_to_category = {v: k for k, v in category_ids.items()}
+            sub_category_ids = {
+                (name, id_to_category[category_id]): sub_category_id
+                for name, category_id, sub_category_id in conn.execute(select(
+                    self.sub_categories.c.name,
+                    self.sub_categories.c.category_id,
+                    self.sub_categories.c.sub_category_id,
+                ))
+                if category_id in id_to_category
+            }
+        with self._lock:
+            self._store_ids.update(store_ids)
+            self._location_ids.update(location_ids)
+            self._category_ids.update(category_ids)
+            self._sub_category_ids.update(sub_category_ids)
+        logging.info(
+            f"Dimension cache loaded: {len(store_ids)} stores, {len(location_ids)} locations, "
+            f"{len(category_ids)} categories, {len(sub_category_ids)} subcategories"
+        )
+        return self
+
+    def _lookup(self, cache, key, create):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+            with self.engine.begin() as conn:
+                value = create(conn)
+            cache[key] = value
+            return value
+
+    def _created(self, conn):
+        self.created += 1
+        bump_version(conn, self.engine, self.versions, REFERENCE_DATA)
+
+    def store_id(self, name):
+        def create(conn):
+            result = conn.execute(
+                dialect_insert(self.engine, self.stores).values(name=name)
+                .on_conflict_do_nothing(index_elements=['name'])
+            )
+            if result.rowcount:
+                self._created(conn)
+            return conn.execute(
+                select(self.stores.c.store_id).where(self.stores.c.name == name)
+            ).scalar_one()
+        return self._lookup(self._store_ids, name, create)
+
+    def location_id(self, city):
+        def create(conn):
+            # Locations have no unique constraint on every schema, so no ON CONFLICT here
+            location_id = conn.execute(
+                select(self.locations.c.location_id).where(self.locations.c.city == city)
+            ).scalar()
+            if location_id is None:
+                location_id = conn.execute(
+                    self.locations.insert().values(city=city, country='Italy')
+                ).inserted_primary_key[0]
+                self._created(conn)
+            return location_id
+        return self._lookup(self._location_ids, city, create)
+
+    def category_id(self, name):
+        def create(conn):
+            result = conn.execute(
+                dialect_insert(self.engine, self.categories).values(name=name)
+                .on_conflict_do_nothing(index_elements=['name'])
+            )
+            if result.rowcount:
+                self._created(conn)
+            return conn.execute(
+                select(self.categories.c.category_id).where(self.categories.c.name == name)
+            ).scalar_one()
+        return self._lookup(self._category_ids, name, create)
+
+    def sub_category_id(self, name, category_name):
+        category_id = self.category_id(category_name)
+
+        def create(conn):
+            conn.execute(
+                dialect_insert(self.engine, self.sub_categories)
+                .values(name=name, category_id=category_id)
+                .on_conflict_do_nothing(index_elements=['name', 'category_id'])
+            )
+            return conn.execute(
+                select(self.sub_categories.c.sub_category_id).where(
+                    self.sub_categories.c.name == name,
+                    self.sub_categories.c.category_id == category_id,
+                )
+            ).scalar_one()
+        return self._lookup(self._sub_category_ids, (name, category_name), create)
+
+    def __str__(self):
+        return f"hits={self.hits} misses={self.misses} created={self.created}"
@@ -1,19 +1,37 @@
 import asyncio
-import aiohttp
-from aiohttp import ClientSession
-from bs4 import BeautifulSoup
 import logging
 import itertools
 import time
-import re
 from datetime import datetime
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Float, Date, ForeignKey, UniqueConstraint
+    create_engine, Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey, UniqueConstraint, Index
 )
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship, backref
 import argparse
 import os
-from concurrent.futures import ThreadPoolExecutor
+import socket
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import parsing
+from bulk_writer import BulkWriter
+from dimension_cache import DimensionCache
+from pipeline import CrawlPipeline, PipelineConfig
+from http_cache import ResponseCache
+from rate_limit import RateLimiter, RateLimitConfig
+from http_client import CrawlerClient, ClientConfig
+from retry import RetryPolicy, BreakerConfig
+from journal import CrawlJournal, FETCHED, PARSED, COMMITTED
+from archive import ResponseArchive, ReplayClient
+from categories import CategoryIndex, DEFAULT_MAPPING_PATH
+from work_queue import WorkQueue
+from matching import ProductMatcher
+from records import ProductRecord
+from copy_loader import CopyLoader
+from catalog import refresh_catalog
+from scheduler import RecrawlScheduler, DAY
+import metrics
 
 # SQLAlchemy setup for PostgreSQL
 DATABASE_URI = os.getenv('DATABASE_URI', 'sqlite:///products.db')
@@ -94,8 +112,69 @@ class ProductPrice(Base):
         UniqueConstraint('product_id', 'store_id', 'location_id', name='_price_uc'),
     )
 
+# Define the PriceHistory model: one row per actual price change
+class PriceHistory(Base):
+    __tablename__ = 'price_history'
+
+    history_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False)
+    store_id = Column(Integer, ForeignKey('stores.store_id', ondelete='CASCADE'), nullable=False)
+    location_id = Column(Integer, ForeignKey('locations.location_id', ondelete='CASCADE'), nullable=False)
+    price = Column(Float, nullable=False)
+    valid_from = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('product_id', 'store_id', 'location_id', 'valid_from', name='_price_history_uc'),
+    )
+
+# Define the ProductMatch model: the canonical product each product is the same item as
+class ProductMatch(Base):
+    __tablename__ = 'product_matches'
+
+    product_id = Column(Integer, ForeignKey('products.product_id', ondelete='CASCADE'), primary_key=True)
+    canonical_id = Column(Integer, ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False, index=True)
+    matched_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# Define the ProductMatchKey model: LSH buckets of every matched product
+class ProductMatchKey(Base):
+    __tablename__ = 'product_match_keys'
+
+    bucket = Column(BigInteger, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.product_id', ondelete='CASCADE'), primary_key=True)
+
+# Define the CrawlTask model: one subcategory page of a work queue run
+class CrawlTask(Base):
+    __tablename__ = 'crawl_tasks'
+
+    task_id = Column(Integer, primary_key=True)
+    run_id = Column(String, nullable=False)
+    store = Column(String, nullable=False)
+    location = Column(String, nullable=False)
+    url = Column(String, nullable=False)
+    state = Column(String, nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    leased_by = Column(String)
+    lease_expires_at = Column(DateTime)
+    last_error = Column(String)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('run_id', 'store', 'location', 'url', name='_crawl_task_uc'),
+        Index('ix_crawl_tasks_run_state', 'run_id', 'state', 'lease_expires_at'),
+    )
+
+# Define the CacheVersion model: bumped when data the web app caches changes
+class CacheVersion(Base):
+    __tablename__ = 'cache_versions'
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
 # Base metadata creation
 Base.metadata.create_all(engine)
+dimension_cache = DimensionCache(engine, Base.metadata)
+bulk_writer = BulkWriter(engine, Base.metadata, dimension_cache)
 
 # Configure logging
 logging.basicConfig(
@@ -106,769 +185,240 @@ logging.basicConfig(
 
 BASE_URL = 'https://glovoapp.com'
 
+# Configured by configure_parsing(); parsing runs inline until then
+parse_executor = None
+parser_backend = 'html.parser'
+
+# Grid titles -> (main category, subcategory), compiled from category_mapping.json
+category_index = CategoryIndex.from_file()
+
+# Learns per-page change rates when runs are planned with --schedule
+recrawl_scheduler = None
 
-category_mapping = {
-    "Beverages": {
-        "Alcoholic Beverages": [
-            "Alcoliche",
-            "Alcolici",
-            "Aperitivi alcolici",
-            "Aperitivi analcolici",
-            "Birra in bottiglia",
-            "Birra in lattina",
-            "Birre",
-            "Birre analcoliche",
-            "Gin",
-            "Limoncello",
-            "Liquori",
-            "Prosecco",
-            "Prosecco e spumante",
-            "Rhum",
-            "Tequila",
-            "Vini bianchi",
-            "Vini bianchi DOCG",
-            "Vini rossi",
-            "Vini rosati e frizzanti",
-            "Vino bianco",
-            "Vino rosato",
-            "Vino rosso",
-            "Vodka",
-            "Whiskey",
-            "Superalcolici"
-        ],
-        "Non-Alcoholic Beverages": [
-            "100% succo",
-            "Analcoliche",
-            "Analcolici",
-            "Acqua frizzante",
-            "Acqua naturale",
-            "Acqua tonica",
-            "Acque aromatizzate",
-            "Aromi",
-            "Bevande a base di latte",
-            "Bevande da aperitivo",
-            "Bevande e integratori",
-            "Bevande vegetali",
-            "Coca-Cola",
-            "Cola",
-            "Effervescente naturale",
-            "Energy drink",
-            "Succo di limone",
-            "Succhi",
-            "Succhi e spremute fresche",
-            "Succhi multipack",
-            "The",
-            "Tè e caffè",
-            "Tè freddo",
-            "Tè, tisane e camomille",
-            "Sostituti del latte",
-            "Sostitutivi del latte"
-        ],
-        "Specialty Beverages": [
-            "Aceto",
-            "Aceto e glasse",
-            "Aromi e decorazioni pasticceria",
-            "Aromi e spezie",
-            "Caffè in capsule A Modo Mio",
-            "Caffè in capsule Dolce Gusto",
-            "Caffè in capsule Nespresso",
-            "Caffè in cialde",
-            "Caffè in grani e macinato",
-            "Caffè macinato",
-            "Caffè solubile",
-            "Caffè solubile, orzo e sostitutivi",
-            "Orzo e sostitutivi caffè"
-        ]
-    },
-    "Food": {
-        "Dairy Products": [
-            "Burro",
-            "Burro e margarina senza lattosio",
-            "Latte intero",
-            "Latte kefir",
-            "Latte scremato e parzialmente scremato",
-            "Latte scremato e parzialmente scremato senza lattosio",
-            "Latte uht intero",
-            "Latte uht scremato e parzialmente scremato",
-            "Latticini e albumi",
-            "Panna fresca",
-            "Panna uht",
-            "Ricotta",
-            "Ricotta e mascarpone",
-            "Mascarpone",
-            "Yogurt da bere",
-            "Yogurt intero - altri gusti",
-            "Yogurt intero - bianco",
-            "Yogurt intero - frutta",
-            "Yogurt intero senza lattosio",
-            "Yogurt magro - altri gusti",
-            "Yogurt magro - bianco",
-            "Yogurt magro - frutta",
-            "Yogurt magro senza lattosio"
-        ],
-        "Meat & Seafood": [
-            "Affettati di pollo e tacchino",
-            "Affettati e salumi vegetali",
-            "Affumicati di pesce",
-            "Bresaola",
-            "Carne al naturale surgelata",
-            "Carne in scatola",
-            "Carne macinata",
-            "Carne panata surgelata",
-            "Mortadella",
-            "Prosciutto cotto",
-            "Prosciutto crudo",
-            "Salame",
-            "Salumi e affettati vegetali",
-            "Salumi e formaggi",
-            "Salumi interi o tranci",
-            "Salumi quadrettati",
-            "Tonno al naturale",
-            "Tonno sott’olio",
-            "Pollo",
-            "Tacchino",
-            "Suino",
-            "Pesce al naturale surgelato",
-            "Pesce panelaborato surgelato",
-            "Prodotti di pesce elaborati",
-            "Specialità di pesce",
-            "Specialità ittiche"
-        ],
-        "Bakery & Bread": [
-            "Biscotti da pasticceria",
-            "Biscotti frollini",
-            "Biscotti gelato",
-            "Biscotti integrali e salutistici",
-            "Biscotti ripieni",
-            "Biscotti secchi",
-            "Biscotti senza glutine",
-            "Biscotti.",
-            "Cornetti e croissant",
-            "Fette biscottate",
-            "Fette Biscottate, confetture e creme spalmbili",
-            "Pane bauletto",
-            "Pane confezionato e a fette",
-            "Pane confezionato senza glutine",
-            "Pane croccante",
-            "Pane fresco",
-            "Pane grattugiato",
-            "Panini",
-            "Panini per hamburger e hot dog",
-            "Panettone",
-            "Pandoro",
-            "Piadine",
-            "Piadine e specialità",
-            "Piadine senza glutine",
-            "Tramezzini/Toast"
-        ],
-        "Pasta & Rice": [
-            "Pasta Fresca",
-            "Pasta all'uovo",
-            "Pasta corta senza glutine",
-            "Pasta di semola brodi e minestrine",
-            "Pasta di semola corta",
-            "Pasta di semola lunga",
-            "Pasta di semola specialità",
-            "Pasta e riso surgelati",
-            "Pasta e sughi",
-            "Pasta fresca non ripiena",
-            "Pasta fresca ripiena",
-            "Pasta integrale, farro e altri",
-            "Pasta lunga senza glutine",
-            "Pasta ripiena e gnocchi",
-            "Pasta sfoglia e altri basi",
-            "Paste filate",
-            "Riso bianco",
-            "Riso parboiled",
-            "Riso specialità",
-            "Risotto"
-        ],
-        "Condiments & Sauces": [
-            "Condimenti",
-            "Condimenti e conserve",
-            "Ketchup e barbeque",
-            "Maionese",
-            "Salse lunga conservazione",
-            "Salse, patè e spalmabili",
-            "Sughi",
-            "Sughi a lunga conservazione",
-            "Sughi e salse surgelati",
-            "Sughi freschi",
-            "Sughi pronti",
-            "Passata di pomodoro",
-            "Polpa di pomodoro",
-            "Concentrati di pomodoro",
-            "Concentrato di pomodoro"
-        ],
-        "Snacks": [
-            "Barrette dolci",
-            "Barrette e Merendine",
-            "Barrette e altri prodotti dietetici",
-            "Barrette senza glutine",
-            "Crackers",
-            "Crackers, gallette e grissini senza glutine",
-            "Gallette",
-            "Merendine",
-            "Merendine senza glutine",
-            "Snack cioccolato",
-            "Snack dolci",
-            "Snack dolci e salati",
-            "Snack salati",
-            "Snacks salati",
-            "Pop corn",
-            "Taralli",
-            "Taralli, patatine e stuzzichini",
-            "Tavolette di cioccolato",
-            "Wafer",
-            "Wafers"
-        ],
-        "Frozen Foods": [
-            "Carne al naturale surgelata",
-            "Carne panata surgelata",
-            "Pizza condita surgelata",
-            "Pizza margherita surgelata",
-            "Panetteria surgelata",
-            "Pasticceria surgelata",
-            "Pesce al naturale surgelato",
-            "Pesce panelaborato surgelato",
-            "Minestroni e vellutate surgelate",
-            "Patatine surgelate",
-            "Secondi vegetali surgelati",
-            "Preparati di pesce surgelati",
-            "Surgelati",
-            "Surgelati e gelati",
-            "Pizze e focacce",
-            "Pizzeria",
-            "Sorbetti",
-            "Stecchi gelato",
-            "Torte gelato"
-        ],
-        "Fresh Produce": [
-            "Altra frutta fresca",
-            "Altra verdura fresca",
-            "Altre alternative vegetali",
-            "Altri prodotti vegetali",
-            "Carote",
-            "Mele",
-            "Pere",
-            "Sedano",
-            "Zucchine, melanzane e peperoni",
-            "Funghi",
-            "Funghi conservati",
-            "Fragole e frutti di bosco",
-            "Frutta esotica",
-            "Frutta essiccata e disidratata",
-            "Frutta preparata",
-            "Frutta sciroppata",
-            "Frutta secca con guscio",
-            "Frutta secca senza guscio",
-            "Piante aromatiche"
-        ],
-        "Specialty & Gourmet": {
-            "Specialty Foods": [
-                "Altra pasta speciale",
-                "Altre conserve di pesce",
-                "Altre salse a lunga conservazione",
-                "Altre specialità di riso",
-                "Altri prodotti vegetali",
-                "Specialità vegetali",
-                "Specialità ittiche"
-            ],
-            "Gourmet Items": [
-                "Grana",
-                "Grappa",
-                "Marmellate",
-                "Miele",
-                "Olio extravergine d'oliva",
-                "Olio d’oliva",
-                "Olio extravergine d’oliva",
-                "Olive",
-                "Olive e frutta secca"
-            ]
-        }
-    },
-    "Personal Care": {
-        "Hair Care": [
-            "Accessori capelli",
-            "Balsamo capelli",
-            "Colorazione capelli",
-            "Shampoo",
-            "Shampoo + balsamo",
-            "Shampoo capelli",
-            "Shampoo e balsamo",
-            "Maschere e trattamento capelli",
-            "Styling capelli"
-        ],
-        "Skin & Body Care": [
-            "Accessori e altro cura corpo",
-            "Bagno doccia schiuma",
-            "Bagno e doccia schiuma",
-            "Bagno/Doccia",
-            "Balsamo e maschere",
-            "Creme corpo e talco",
-            "Creme e gel mani",
-            "Creme spalmabili",
-            "Cura viso e creme",
-            "Corpo",
-            "Cosmetica unghie",
-            "Cosmetica viso",
-            "Maschere e altro cura viso",
-            "Tinte"
-        ],
-        "Oral Care": [
-            "Accessori pulizia denti",
-            "Dentifrici",
-            "Spazzolini"
-        ],
-        "Deodorants & Antiperspirants": [
-            "Deodorante roll-on",
-            "Deodorante spray",
-            "Deodoranti",
-            "Deodoranti azione continua",
-            "Deodoranti azione istantanea",
-            "Deodoranti roll-on",
-            "Deodoranti spray"
-        ],
-        "Other Personal Care": [
-            "Depilazione donna",
-            "Profumi persona",
-            "Pre/Post barba",
-            "Prodotti dopo barba",
-            "Prodotti pre barba",
-            "Rasoi uomo",
-            "Lame e rasoi donna",
-            "Lame e rasoi uomo",
-            "Intimo",
-            "Intimo donna"
-        ]
-    },
-    "Household Products": {
-        "Cleaning Supplies": [
-            "Additivi lavastoviglie",
-            "Candeggina",
-            "Candeggine e detergenti bagno",
-            "Detergenti multiuso",
-            "Detergenti per pavimenti",
-            "Detergenti superfici",
-            "Detergenti e salviette intime",
-            "Detergenti e struccanti",
-            "Detergenti intimi",
-            "Insetticidi striscianti",
-            "Insetticidi volanti",
-            "Lavastoviglie",
-            "Lavastoviglie in caps",
-            "Lavastoviglie liquido e in polvere",
-            "Lavatrice",
-            "Anticalcare",
-            "Anticalcare e addittivi lavatrice",
-            "Igienizzanti, sgrassatori e anticalcare",
-            "Trattamento superfici e mobilio"
-        ],
-        "Laundry Supplies": [
-            "Ammorbidenti",
-            "Ammorbidenti e profumatori",
-            "Detersivi lavatrice liquidi e in caps",
-            "Saponi bucato",
-            "Trattamento bucato/asciugatura"
-        ],
-        "Paper Products": [
-            "Carta igienica",
-            "Rotoli di carta",
-            "Rotoli e tovaglioli di carta",
-            "Tovaglioli",
-            "Fazzoletti",
-            "Fazzolettini",
-            "Panni e spugne"
-        ],
-        "Kitchen Supplies": [
-            "Alluminio, pellicola e carta forno",
-            "Avvolgenti per alimenti",
-            "Sacchetti e vaschette per alimenti",
-            "Sacchetti/Vaschette",
-            "Vaschette",
-            "Vaschette gelato",
-            "Sacchetti per la spazzatura",
-            "Utensileria cucina",
-            "Pentole, padelle e teglie",
-            "Stoviglie",
-            "Piatti, bicchieri e posate"
-        ],
-        "Laundry Supplies": [
-            "Ammorbidenti",
-            "Ammorbidenti e profumatori",
-            "Detersivi lavatrice liquidi e in caps",
-            "Saponi bucato",
-            "Trattamento bucato/asciugatura"
-        ],
-        "Miscellaneous Household Items": [
-            "Articoli sanitari",
-            "Bastoncini di cotone",
-            "Bastoncini e cotone",
-            "Candele profumate",
-            "Candeline torta",
-            "Candeline torte",
-            "Guanti",
-            "Nidi",
-            "Stendo e stiro"
-        ]
-    },
-    "Pet Supplies": {
-        "Dog Supplies": [
-            "Cibo secco e crocchette cane",
-            "Cibo umido cane",
-            "Snack e biscotti cane",
-            "Igiene e accessori cane"
-        ],
-        "Cat Supplies": [
-            "Cibo secco e crocchette gatto",
-            "Cibo umido gatto",
-            "Snack gatto",
-            "Igiene e accessori gatto"
-        ],
-        "Other Pets": [
-            "Cibo altri animali"
-        ]
-    },
-    "Health & Wellness": {
-        "Medical Supplies": [
-            "Articoli sanitari",
-            "Pronto soccorso"
-        ],
-        "Personal Health": [
-            "Incontinenza",
-            "Cura delle dentiere",
-            "Integratori alimentari",
-            "Integratori e vitamine",
-            "Assorbenti esterni",
-            "Assorbenti interni",
-            "Protezioni solari"
-        ],
-        "Health Care Products": [
-            "Cura viso e creme",
-            "Cura wc e tubature",
-            "Prodotti proteici"
-        ]
-    },
-    "Household Accessories": {
-        "Storage & Organization": [
-            "Borse e shopper riutilizzabili",
-            "Shopper"
-        ],
-        "Home Decor": [
-            "Candele profumate",
-            "Candeline torta",
-            "Candeline torte",
-            "Lucidi e cura scarpe"
-        ],
-        "Miscellaneous Accessories": [
-            "Accessori cibo",
-            "Accessori",
-            "Accessori pulizia denti"
-        ]
-    },
-    "Specialty & Gourmet": {
-        "Specialty Foods": [
-            "Altra pasta speciale",
-            "Altre conserve di pesce",
-            "Altre salse a lunga conservazione",
-            "Altre specialità di riso",
-            "Altri prodotti vegetali",
-            "Specialità vegetali",
-            "Specialità ittiche"
-        ],
-        "Gourmet Items": [
-            "Grana",
-            "Grappa",
-            "Marmellate",
-            "Miele",
-            "Olio extravergine d'oliva",
-            "Olio d’oliva",
-            "Olio extravergine d’oliva",
-            "Olive",
-            "Olive e frutta secca"
-        ]
-    },
-    "Frozen & Refrigerated": {
-        "Frozen Meals": [
-            "Piatti pronti",
-            "Secondi piatti pronti",
-            "Insalate",
-            "Minestroni e vellutate surgelate"
-        ],
-        "Frozen Desserts": [
-            "Dessert gelato",
-            "Torte gelato"
-        ],
-        "Frozen Ingredients": [
-            "Preparati di pesce surgelati",
-            "Preparati per bevande"
-        ]
-    },
-    "Snacks & Sweets": {
-        "Sweet Snacks": [
-            "Barrette dolci",
-            "Barrette e Merendine",
-            "Barrette e altri prodotti dietetici",
-            "Barrette senza glutine",
-            "Caramelle",
-            "Caramelle dure",
-            "Caramelle morbide",
-            "Tavolette di cioccolato",
-            "Praline e cioccolatini",
-            "Torrone",
-            "Wafer",
-            "Wafers"
-        ],
-        "Savory Snacks": [
-            "Snack salati",
-            "Snacks salati",
-            "Patatine",
-            "Taralli, patatine e stuzzichini"
-        ]
-    },
-    "Miscellaneous": {
-        "Cooking Essentials": [
-            "Farina",
-            "Farine e altre miscele",
-            "Semi",
-            "Lieviti",
-            "Olio d'oliva",
-            "Olio di semi"
-        ],
-        "Specialty Ingredients": [
-            "Aromi e spezie",
-            "Aromi",
-            "Spezie ed aromi"
-        ],
-        "Others": [
-            "Utensileria cucina",
-            "Prodotti pre barba",
-            "Prodotti dopo barba",
-            "Prodotti proteici",
-            "Prodotti per la salute",
-            "Prodotti per pavimenti"
-        ]
-    }
-}
-# Utility functions to interact with the category mapping
 
 def find_main_category(subcategory_name):
     """Find and return the main category and subcategory for a given subcategory name."""
-    for main_category, subcategories in category_mapping.items():
-        if isinstance(subcategories, dict):
-            for subcat_key, subcat_list in subcategories.items():
-                if subcategory_name in subcat_list:
-                    return subcategory_name, subcat_key
-        else:
-            if subcategory_name in subcategories:
-                return main_category, None
-    return "Uncategorized", "Uncategorized"
-
-async def fetch(session: ClientSession, url: str) -> str:
-    headers = {
-        'User-Agent': (
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
-            ' AppleWebKit/537.36 (KHTML, like Gecko)'
-            ' Chrome/85.0.4183.102 Safari/537.36'
-        )
-    }
-    async with session.get(url, headers=headers) as response:
-        response.raise_for_status()
-        return await response.text()
-
-async def extract_subcategory_links(session: ClientSession, url: str) -> list:
+    main_category, sub_category_key = category_index.classify(subcategory_name)
+    if main_category == "Uncategorized":
+        return main_category, sub_category_key
+    return subcategory_name, sub_category_key
+
+async def fetch(client: CrawlerClient, url: str) -> bytes:
+    response = await client.get(url)
+    return response.body
+
+async def fetch_if_modified(client: CrawlerClient, url: str, cache: ResponseCache):
+    """Conditional GET; returns None when the page is unchanged since its last commit."""
+    response = await client.get(url, headers=cache.conditional_headers(url))
+    if response.status == 304:
+        cache.record_not_modified(url)
+        return None
+    if not cache.is_changed(url, response.headers, response.body):
+        return None
+    return response.body
+
+def configure_parsing(processes: int, backend: str = 'auto'):
+    """Set up the process pool and parser backend used for every page of the run."""
+    global parse_executor, parser_backend
+    parser_backend = parsing.resolve_backend(backend)
+    parse_executor = ProcessPoolExecutor(max_workers=processes) if processes > 0 else None
+    logging.info(f"Parsing with {parser_backend} in {processes or 'no'} worker processes")
+
+async def run_parser(func, *args):
+    """Run a parsing function in the process pool, or inline when no pool is configured."""
+    if parse_executor is None:
+        return func(*args, backend=parser_backend)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(parse_executor, partial(func, *args, backend=parser_backend))
+
+async def extract_subcategory_links(client: CrawlerClient, url: str) -> list:
     try:
-        html_content = await fetch(session, url)
-        soup = BeautifulSoup(html_content, 'html.parser')
-        links = []
-        carousel_elements = soup.find_all('div', {'class': 'carousel__content__element'})
-
-        for element in carousel_elements:
-            a_tag = element.find('a', href=True)
-            if a_tag:
-                link = a_tag['href']
-                if not link.startswith('http'):
-                    link = BASE_URL + link 
-                links.append(link)
-        return links
+        html_content = await fetch(client, url)
+        return await run_parser(parsing.parse_subcategory_links, html_content, BASE_URL)
     except Exception as e:
         logging.error(f"Error fetching subcategory links from {url}: {e}")
         return []
 
-async def scrape_product_details(session: ClientSession, link: str) -> list:
-    try:
-        await asyncio.sleep(1)  # Throttle requests
-        html_content = await fetch(session, link)
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-
-        all_products = []
-        grids = soup.find_all('div', class_='grid')
-
-        for grid in grids:
-            sub_category_name = grid.find('h2', class_='grid__title').get_text(strip=True) if grid.find('h2', class_='grid__title') else 'N/A'
-        
-            category_name, sub_category_key = find_main_category(sub_category_name)
-            for item in grid.find_all('div', class_='tile'):
-                raw_product_name = item.find('span', class_='tile__description').get_text(strip=True) if item.find('span', class_='tile__description') else 'N/A'
-                product_name = clean_product_name(raw_product_name)  # Clean the product name
-
-                # Extract and clean the price
-                product_price = item.find('span', class_='product-price__effective').get_text(strip=True) if item.find('span', 'product-price__effective') else 'N/A'
-                if product_price != 'N/A':
-                    product_price = product_price.replace('€', '').replace(',', '.').strip()  # Remove the Euro symbol and replace comma with dot
-                    try:
-                        product_price = float(product_price)  # Convert to float
-                    except ValueError:
-                        logging.error(f"Error converting price '{product_price}' to float.")
-                        product_price = None  # Assign None if conversion fails
-                
-                image_url = item.find('img', class_='tile__image')['src'] if item.find('img', class_='tile__image') else 'N/A'
-                if product_price < 0.15 or product_price == 999:
-                    continue
-                all_products.append({
-                    'link': link,
-                    'sub_category': sub_category_name,
-                    'category': category_name,
-                    'name': product_name.title(),
-                    'price': product_price,
-                    'image_url': image_url
-                })
-        return all_products
-
-    except Exception as e:
-        logging.error(f"Error fetching product details from {link}: {e}")
-        return []
-def clean_product_name(name):
+def build_products(records: list, link: str) -> list:
+    """Turn parsed (sub_category, name, price, image_url) tuples into ProductRecords."""
+    categories = {}
+    all_products = []
+    for sub_category_name, product_name, product_price, image_url in records:
+        if sub_category_name not in categories:
+            categories[sub_category_name], _ = find_main_category(sub_category_name)
+        all_products.append(ProductRecord(
+            link, sub_category_name, categories[sub_category_name], product_name, product_price, image_url
+        ))
+    return all_products
+
+async def scrape_store_location(
+    store_name: str,
+    location_name: str,
+    client: CrawlerClient,
+    pipeline_config: PipelineConfig = None,
+    response_cache: ResponseCache = None,
+    journal: CrawlJournal = None,
+    links: list = None,
+    on_committed=None
+):
     """
-    Removes any trailing ' - number' from the product name.
-    
-    Examples:
-        "Product Name - 123" -> "Product Name"
-        "Another Product-456" -> "Another Product"
+    Crawl one store/location. `links` restricts the crawl to those
+    subcategory pages instead of discovering them from the landing page;
+    `on_committed(links)` is called as pages are committed or found unchanged.
     """
-    if not isinstance(name, str):
-        return name
-    # This regex looks for a hyphen followed by optional spaces and digits at the end of the string
-    cleaned_name = re.sub(r'\s*-\s*\d+$', '', name)
-    return cleaned_name
-
-def upsert_product(db_session, product_data, store_name, location_name):
-    # Get or create Store
-    store = db_session.query(Store).filter_by(name=store_name).first()
-    if not store:
-        store = Store(name=store_name)
-        db_session.add(store)
-        db_session.commit()
-
-    # Get or create Location
-    location = db_session.query(Location).filter_by(city=location_name).first()
-    if not location:
-        location = Location(city=location_name)
-        db_session.add(location)
-        db_session.commit()
-
-    # Get or create Category
-    category = db_session.query(Category).filter_by(name=product_data['category']).first()
-    if not category:
-        category = Category(name=product_data['category'])
-        db_session.add(category)
-        db_session.commit()
-
-    # Get or create SubCategory
-    sub_category = db_session.query(SubCategory).filter_by(
-        name=product_data['sub_category'],
-        category_id=category.category_id
-    ).first()
-    if not sub_category:
-        sub_category = SubCategory(name=product_data['sub_category'], category=category)
-        db_session.add(sub_category)
-        db_session.commit()
-
-    # Get or create Product
-    product = db_session.query(Product).filter_by(
-        name=product_data['name']
-    ).first()
-    if not product:
-        product = Product(
-            name=product_data['name'],
-            sub_category=sub_category,
-            link=product_data['link'],
-            image_url=product_data['image_url']
-        )
-        db_session.add(product)
-        db_session.commit()
-    else:
-        # Update existing product details if necessary
-        product.link = product_data['link']
-        product.image_url = product_data['image_url']
-        db_session.commit()
-
-    # Insert or update ProductPrice
-    product_price = db_session.query(ProductPrice).filter_by(
-        product_id=product.product_id,
-        store_id=store.store_id,
-        location_id=location.location_id
-    ).first()
-
-    if not product_price:
-        # Insert new price entry
-        product_price = ProductPrice(
-            product=product,
-            store=store,
-            location=location,
-            price=product_data['price'],
-            last_updated=datetime.utcnow().date()
-        )
-        db_session.add(product_price)
-    else:
-        # Update existing price if it has changed
-        product_price.price = product_data['price']
-        product_price.last_updated = datetime.utcnow().date()
-    db_session.commit()
-
-async def scrape_store_location(store_name: str, location_name: str):
     logging.info(f"Scraping {store_name} in {location_name}")
     url = f"{BASE_URL}/it/it/{location_name}/{store_name}-{location_name[0:3]}/"
 
     try:
-        async with ClientSession() as session:
-            subcategory_links = await extract_subcategory_links(session, url)
+        if links is not None:
+            subcategory_links = links
+        elif journal is not None and journal.links(store_name, location_name):
+            # Resumed run: the landing page was already crawled, only unfinished pages are left
+            subcategory_links = journal.pending(store_name, location_name)
+            logging.info(f"Resuming {len(subcategory_links)} subcategories for {store_name} in {location_name}")
+        else:
+            subcategory_links = await extract_subcategory_links(client, url)
             logging.info(f"Found {len(subcategory_links)} subcategories for {store_name} in {location_name}")
-
-            # Limit the number of concurrent tasks to avoid overwhelming the server
-            semaphore = asyncio.Semaphore(5)
-
-            async def sem_task(link):
-                async with semaphore:
-                    return await scrape_product_details(session, link)
-
-            tasks = [sem_task(link) for link in subcategory_links]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Handle exceptions in results
-            products = []
-            for result in results:
-                if isinstance(result, Exception):
-                    logging.error(f"Exception during scraping: {result}")
-                else:
-                    products.extend(result)
-
-            # Use ThreadPoolExecutor for database operations to avoid blocking the event loop
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                loop = asyncio.get_running_loop()
-                db_tasks = [
-                    loop.run_in_executor(
-                        executor, upsert_product, SessionLocal(), product, store_name, location_name
-                    ) for product in products
-                ]
-                await asyncio.gather(*db_tasks, return_exceptions=True)
-
-            logging.info(f"Data saved for {store_name} in {location_name}")
+            if journal is not None:
+                journal.add_links(store_name, location_name, subcategory_links)
+
+        def mark(links, state):
+            if journal is not None:
+                journal.mark(store_name, location_name, links, state)
+            if state == COMMITTED and on_committed is not None:
+                on_committed(links)
+
+        async def fetch_page(link):
+            if response_cache is None:
+                body = await fetch(client, link)
+            else:
+                body = await fetch_if_modified(client, link, response_cache)
+                if recrawl_scheduler is not None:
+                    recrawl_scheduler.observe(link, changed=body is not None)
+            # Unchanged pages have nothing left to write
+            mark([link], FETCHED if body is not None else COMMITTED)
+            return body
+
+        async def parse_page(link, html_content):
+            records = await run_parser(parsing.parse_product_page, html_content)
+            mark([link], PARSED)
+            return build_products(records, link)
+
+        async def write_batch(products):
+            # Write off the event loop, one transaction per batch
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, bulk_writer.write_batch, products, store_name, location_name
+            )
+
+        # Fetch, parse and write concurrently through bounded queues
+        def on_batch_committed(links):
+            if response_cache is not None:
+                response_cache.commit(links)
+            mark(links, COMMITTED)
+
+        pipeline = CrawlPipeline(fetch_page, parse_page, write_batch, pipeline_config, on_batch_committed)
+        stats = await pipeline.run(subcategory_links)
+
+        logging.info(f"Data saved for {store_name} in {location_name}: {stats}")
+        return stats
 
     except Exception as e:
         logging.error(f"Error scraping {store_name} in {location_name}: {e}")
 
+async def plan_recrawl(targets: list, client: CrawlerClient, budget: int = None) -> tuple:
+    """
+    Discover the subcategory pages of every target and keep the ones the
+    scheduler expects to be stale; returns (discovered, chosen) mappings of
+    (store, location) to links.
+    """
+    async def discover(store_name, location_name):
+        url = f"{BASE_URL}/it/it/{location_name}/{store_name}-{location_name[0:3]}/"
+        links = await extract_subcategory_links(client, url)
+        logging.info(f"Found {len(links)} subcategories for {store_name} in {location_name}")
+        return links
+
+    discovered = dict(zip(targets, await asyncio.gather(*(discover(*target) for target in targets))))
+    return discovered, recrawl_scheduler.plan(discovered, budget)
+
+async def seed_work_queue(queue: WorkQueue, run_id: str, targets: list, client: CrawlerClient):
+    """Discover the subcategory pages of every target and add them to the queue."""
+    async def seed(store_name, location_name):
+        url = f"{BASE_URL}/it/it/{location_name}/{store_name}-{location_name[0:3]}/"
+        links = await extract_subcategory_links(client, url)
+        added = queue.enqueue(run_id, store_name, location_name, links)
+        logging.info(f"Queued {added} of {len(links)} subcategories for {store_name} in {location_name}")
+
+    await asyncio.gather(*(seed(store_name, location_name) for store_name, location_name in targets))
+    logging.info(f"Work queue {run_id}: {queue.counts(run_id)}")
+
+async def work_queue_worker(
+    queue: WorkQueue,
+    run_id: str,
+    client: CrawlerClient,
+    pipeline_config: PipelineConfig = None,
+    response_cache: ResponseCache = None,
+    lease_size: int = 50,
+    idle_wait: float = 5.0
+):
+    """Lease and crawl tasks of the run until none are pending or leased."""
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    logging.info(f"Worker {worker_id} joining work queue {run_id}")
+    while True:
+        tasks = queue.lease(run_id, worker_id, lease_size)
+        if not tasks:
+            if queue.drained(run_id):
+                break
+            # Other workers still hold leases that may expire back to us
+            await asyncio.sleep(idle_wait)
+            continue
+
+        groups = defaultdict(dict)
+        for task_id, store_name, location_name, url in tasks:
+            groups[store_name, location_name][url] = task_id
+        held = {task_id for task_id, *_ in tasks}
+
+        def committer(task_ids):
+            def on_committed(links):
+                done = [task_ids[link] for link in links if link in task_ids]
+                queue.complete(done, worker_id)
+                held.difference_update(done)
+            return on_committed
+
+        async def keep_leases():
+            while True:
+                await asyncio.sleep(queue.visibility_timeout / 3)
+                queue.heartbeat(list(held), worker_id)
+
+        heartbeat = asyncio.create_task(keep_leases())
+        try:
+            await asyncio.gather(*(
+                scrape_store_location(
+                    store_name, location_name, client, pipeline_config, response_cache,
+                    links=list(task_ids), on_committed=committer(task_ids)
+                )
+                for (store_name, location_name), task_ids in groups.items()
+            ))
+        finally:
+            heartbeat.cancel()
+            # Pages that failed go back to the queue for another worker
+            queue.release(list(held), worker_id, error='not committed')
+    logging.info(f"Worker {worker_id} done with work queue {run_id}: {queue}")
+
+def match_products(rebuild: bool = False):
+    """Cluster products sold by several stores under one canonical id."""
+    matcher = ProductMatcher(engine, Base.metadata)
+    start = time.perf_counter()
+    stats = matcher.rebuild() if rebuild else matcher.run()
+    logging.info(f"Product matching in {time.perf_counter() - start:.1f}s: {stats}")
+    return stats
+
+async def write_metrics(path: str, interval: float):
+    """Rewrite the Prometheus text file every `interval` seconds while the crawl runs."""
+    while True:
+        metrics.REGISTRY.write(path)
+        await asyncio.sleep(interval)
+
 async def main():
     parser = argparse.ArgumentParser(description="Scrape product data from Glovo")
     parser.add_argument(
@@ -885,13 +435,275 @@ async def main():
         default=["roma"],
         help="Locations to scrape"
     )
+    parser.add_argument("--fetch-workers", type=int, default=5, help="Concurrent page fetches per store")
+    parser.add_argument("--parse-workers", type=int, default=2, help="Concurrent page parsers per store")
+    parser.add_argument("--write-workers", type=int, default=1, help="Concurrent DB batch writers per store")
+    parser.add_argument("--queue-size", type=int, default=10, help="Capacity of each pipeline queue")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Products per DB write batch")
+    parser.add_argument(
+        "--parse-processes",
+        type=int,
+        default=os.cpu_count(),
+        help="Worker processes for HTML parsing (0 parses on the event loop)"
+    )
+    parser.add_argument(
+        "--parser",
+        choices=("auto",) + parsing.BACKENDS,
+        default="auto",
+        help="HTML parser backend"
+    )
+    parser.add_argument(
+        "--cache-path",
+        default="http_cache.sqlite",
+        help="Revalidation cache for subcategory pages"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always download and reparse every subcategory page"
+    )
+    parser.add_argument("--rate", type=float, default=2.0, help="Initial requests/s per host")
+    parser.add_argument("--min-rate", type=float, default=0.2, help="Lowest requests/s per host after backoff")
+    parser.add_argument("--max-rate", type=float, default=10.0, help="Highest requests/s per host")
+    parser.add_argument("--burst", type=int, default=5, help="Token bucket capacity per host")
+    parser.add_argument("--host-concurrency", type=int, default=5, help="In-flight requests per host")
+    parser.add_argument("--connections", type=int, default=100, help="Pooled HTTP connections for the whole run")
+    parser.add_argument("--keepalive", type=float, default=30.0, help="Seconds to keep idle connections open")
+    parser.add_argument("--max-attempts", type=int, default=4, help="Attempts per request before giving up")
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=30.0,
+        help="Seconds to pause a host after its error rate spikes"
+    )
+    parser.add_argument(
+        "--latency-target",
+        type=float,
+        default=2.0,
+        help="Seconds; slower average responses lower the request rate"
+    )
+    parser.add_argument("--journal-path", default="crawl_journal.sqlite", help="Crawl run journal")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Only process unfinished work of an earlier run")
+    parser.add_argument(
+        "--category-mapping",
+        default=DEFAULT_MAPPING_PATH,
+        help="JSON file mapping main categories to Glovo grid titles"
+    )
+    parser.add_argument(
+        "--no-fuzzy-categories",
+        action="store_true",
+        help="Only classify exact (normalized) grid titles, without the closest-match fallback"
+    )
+    parser.add_argument(
+        "--queue",
+        metavar="RUN_ID",
+        help="Crawl tasks from the shared work queue of this run (several processes/hosts can join)"
+    )
+    parser.add_argument(
+        "--seed",
+        action="store_true",
+        help="With --queue: discover subcategories of --stores x --locations and queue them, then exit"
+    )
+    parser.add_argument("--lease-size", type=int, default=50, help="Tasks leased from the work queue at once")
+    parser.add_argument(
+        "--visibility-timeout",
+        type=float,
+        default=300.0,
+        help="Seconds before a leased task that was not renewed goes back to the queue"
+    )
+    parser.add_argument("--task-attempts", type=int, default=3, help="Leases per task before it is marked failed")
+    parser.add_argument(
+        "--bulk-load",
+        action="store_true",
+        help="Write batches with COPY into a staging table and set-based merges (PostgreSQL; "
+             "for first loads and full refreshes, best with a large --batch-size)"
+    )
+    parser.add_argument(
+        "--no-match",
+        action="store_true",
+        help="Skip cross-store product matching after the crawl"
+    )
+    parser.add_argument(
+        "--match-only",
+        action="store_true",
+        help="Only match new products across stores and refresh the catalog view "
+             "(e.g. once the --queue workers are done), then exit"
+    )
+    parser.add_argument(
+        "--rematch",
+        action="store_true",
+        help="Recluster the whole catalog instead of only products not matched yet"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Keep stage metrics in this Prometheus text file (e.g. for node_exporter's textfile collector)"
+    )
+    parser.add_argument("--metrics-interval", type=float, default=15.0, help="Seconds between metrics file updates")
+    parser.add_argument("--metrics-port", type=int, help="Serve stage metrics on http://0.0.0.0:PORT/metrics")
+    parser.add_argument(
+        "--schedule",
+        action="store_true",
+        help="Only crawl subcategory pages likely to have changed, as learned from earlier runs"
+    )
+    parser.add_argument("--schedule-path", default="recrawl_schedule.sqlite", help="Per-page change history")
+    parser.add_argument(
+        "--staleness",
+        type=float,
+        default=0.5,
+        help="With --schedule: crawl pages whose probability of having changed is at least this"
+    )
+    parser.add_argument("--budget", type=int, help="With --schedule: most subcategory pages to request per run")
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=7.0,
+        help="With --schedule: days after which a page is crawled whatever its change rate"
+    )
+    archive_mode = parser.add_mutually_exclusive_group()
+    archive_mode.add_argument(
+        "--record",
+        metavar="ARCHIVE",
+        help="Append every fetched response to a compressed archive (disables revalidation)"
+    )
+    archive_mode.add_argument(
+        "--replay",
+        metavar="ARCHIVE",
+        help="Serve every fetch from a recorded archive, without network or throttling"
+    )
     args = parser.parse_args()
 
-    tasks = [
-        scrape_store_location(store_name, location_name.capitalize())
-        for store_name, location_name in itertools.product(args.stores, args.locations)
+    if args.seed and not args.queue:
+        parser.error("--seed needs --queue RUN_ID")
+    if args.bulk_load and (engine.dialect.name, engine.dialect.driver) != ('postgresql', 'psycopg2'):
+        parser.error("--bulk-load needs a PostgreSQL DATABASE_URI using psycopg2 (postgresql+psycopg2://)")
+    if args.schedule and (args.queue or args.resume):
+        parser.error("--schedule plans fresh local runs; it cannot be used with --queue or --resume")
+    if args.schedule and (args.no_cache or args.record or args.replay):
+        parser.error("--schedule learns from revalidation, which --no-cache, --record and --replay turn off")
+    if args.match_only:
+        match_products(args.rematch)
+        refresh_catalog(engine)
+        return
+
+    # The work queue tracks progress itself, in the database shared by all workers
+    journal = None if args.queue else CrawlJournal(args.journal_path)
+    if args.queue:
+        stores, locations = args.stores, args.locations
+    elif args.resume:
+        stores, locations = journal.resume(args.resume)
+    else:
+        stores, locations = args.stores, args.locations
+        journal.start(stores, locations)
+    targets = [
+        (store_name, location_name.capitalize())
+        for store_name, location_name in itertools.product(stores, locations)
     ]
-    await asyncio.gather(*tasks)
+
+    pipeline_config = PipelineConfig(
+        fetch_workers=args.fetch_workers,
+        parse_workers=args.parse_workers,
+        write_workers=args.write_workers,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+    )
+
+    rate_limiter = RateLimiter(RateLimitConfig(
+        rate=args.rate,
+        min_rate=args.min_rate,
+        max_rate=args.max_rate,
+        burst=args.burst,
+        concurrency=args.host_concurrency,
+        latency_target=args.latency_target,
+    ))
+    client_config = ClientConfig(
+        connections=args.connections,
+        connections_per_host=args.host_concurrency,
+        keepalive_timeout=args.keepalive,
+    )
+    # Recording needs full bodies rather than 304s, and replay must not skip pages
+    use_cache = not (args.no_cache or args.record or args.replay)
+    response_cache = ResponseCache(args.cache_path) if use_cache else None
+    global category_index, bulk_writer, recrawl_scheduler
+    if args.schedule:
+        recrawl_scheduler = RecrawlScheduler(args.schedule_path, args.staleness, args.max_age * DAY)
+    if args.bulk_load:
+        bulk_writer = CopyLoader(engine, Base.metadata, dimension_cache)
+    category_index = CategoryIndex.from_file(args.category_mapping, fuzzy=not args.no_fuzzy_categories)
+    configure_parsing(args.parse_processes, args.parser)
+    dimension_cache.load()
+    metrics_server = await metrics.REGISTRY.serve(port=args.metrics_port) if args.metrics_port else None
+    metrics_writer = (
+        asyncio.create_task(write_metrics(args.metrics_file, args.metrics_interval)) if args.metrics_file else None
+    )
+    try:
+        if args.replay:
+            client = ReplayClient(ResponseArchive(args.replay))
+        else:
+            # One connection pool for every store/location task
+            client = CrawlerClient(
+                client_config,
+                rate_limiter,
+                RetryPolicy(max_attempts=args.max_attempts),
+                BreakerConfig(cooldown=args.breaker_cooldown),
+                ResponseArchive(args.record) if args.record else None,
+            )
+        async with client:
+            if args.queue:
+                queue = WorkQueue(engine, Base.metadata, args.visibility_timeout, args.task_attempts)
+                if args.seed:
+                    await seed_work_queue(queue, args.queue, targets, client)
+                else:
+                    await work_queue_worker(
+                        queue, args.queue, client, pipeline_config, response_cache, args.lease_size
+                    )
+            elif recrawl_scheduler is not None:
+                discovered, chosen = await plan_recrawl(targets, client, args.budget)
+                # Stores with nothing due this run are done; ones whose landing page failed are not
+                targets = [target for target in targets if chosen[target] or not discovered[target]]
+                tasks = []
+                for store_name, location_name in targets:
+                    links = chosen[(store_name, location_name)]
+                    journal.add_links(store_name, location_name, links)
+                    tasks.append(scrape_store_location(
+                        store_name, location_name, client, pipeline_config, response_cache, journal, links
+                    ))
+                await asyncio.gather(*tasks)
+            else:
+                tasks = [
+                    scrape_store_location(
+                        store_name, location_name, client, pipeline_config, response_cache, journal
+                    )
+                    for store_name, location_name in targets
+                ]
+                await asyncio.gather(*tasks)
+    finally:
+        if metrics_writer is not None:
+            metrics_writer.cancel()
+            metrics.REGISTRY.write(args.metrics_file)
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        if journal is not None:
+            journal.finish(targets)
+            journal.close()
+        if parse_executor is not None:
+            parse_executor.shutdown()
+        if response_cache is not None:
+            response_cache.close()
+            logging.info(f"Unchanged pages: {response_cache}")
+        if recrawl_scheduler is not None:
+            recrawl_scheduler.close()
+            logging.info(f"Recrawl schedule: {recrawl_scheduler}")
+    logging.info(f"Rate limits: {rate_limiter}")
+    logging.info(f"Dimension cache: {dimension_cache}")
+    logging.info(f"Category index: {category_index}")
+    # Queue workers leave matching and the catalog refresh to one --match-only run once the queue is drained
+    if not args.queue:
+        if not args.no_match:
+            match_products(args.rematch)
+        refresh_catalog(engine)
+    summary = metrics.REGISTRY.summary()
+    logging.info(f"Crawl metrics:\n{summary}")
+    print(summary)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+import sqlite3
+import time
+
+
+class ResponseCache:
+    """
+    On-disk revalidation cache for subcategory pages, keyed by URL.
+
+    Stores the ETag, Last-Modified and a SHA-256 of the body of the last page
+    whose products were committed. New validators are held in memory until
+    `commit()` is called for their URL, so a page is never marked as seen
+    before its products reach the database.
+    """
+
+    def __init__(self, path='http_cache.sqlite'):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._entries = {
+            url: (etag, last_modified, body_hash)
+            for url, etag, last_modified, body_hash in self._conn.execute(
+                "SELECT url, etag, last_modified, body_hash FROM responses"
+            )
+        }
+        self._pending = {}
+        self.not_modified = 0
+        self.same_hash = 0
+        logging.info(f"Response cache loaded {len(self._entries)} entries from {path}")
+
+    def conditional_headers(self, url):
+        entry = self._entries.get(url)
+        if entry is None:
+            return {}
+        etag, last_modified, _ = entry
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def record_not_modified(self, url):
+        self.not_modified += 1
+
+    def is_changed(self, url, headers, body):
+        """Remember the response for `url`; False when its body matches the cached hash."""
+        body_hash = hashlib.sha256(body).hexdigest()
+        validators = (headers.get('ETag'), headers.get('Last-Modified'), body_hash)
+        entry = self._entries.get(url)
+        if entry is not None and entry[2] == body_hash:
+            self.same_hash += 1
+            # Same content under new validators: its products are already committed,
+            # so save them now and the next run can get a 304
+            if entry != validators:
+                self._entries[url] = validators
+                self._save([(url, *validators, time.time())])
+            return False
+        self._pending[url] = validators
+        return True
+
+    def commit(self, urls):
+        """Persist validators for pages whose products have been written."""
+        rows = []
+        now = time.time()
+        for url in urls:
+            entry = self._pending.pop(url, None)
+            if entry is not None:
+                self._entries[url] = entry
+                rows.append((url, *entry, now))
+        self._save(rows)
+
+    def _save(self, rows):
+        if rows:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO responses (url, etag, last_modified, body_hash, fetched_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+
+    @property
+    def skipped(self):
+        return self.not_modified + self.same_hash
+
+    def close(self):
+        self._conn.close()
+
+    def __str__(self):
+        return f"skipped={self.skipped} (304={self.not_modified} same_hash={self.same_hash})"
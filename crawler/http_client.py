@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+from rate_limit import RateLimiter
+from retry import RetryPolicy, BreakerConfig, CircuitBreaker, is_retryable
+
+try:
+    import brotli  # noqa: F401 - aiohttp and urllib3 decode br when it is installed
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
+        ' AppleWebKit/537.36 (KHTML, like Gecko)'
+        ' Chrome/85.0.4183.102 Safari/537.36'
+    ),
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+
+@dataclass
+class ClientConfig:
+    connections: int = 100        # total pooled connections
+    connections_per_host: int = 5
+    keepalive_timeout: float = 30.0
+    dns_ttl: int = 300            # seconds to cache resolved hosts
+    timeout: float = 30.0
+    connect_timeout: float = 10.0
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict
+    body: bytes
+
+
+class CrawlerClient:
+    """
+    Process-wide HTTP client for the async crawler.
+
+    Owns one aiohttp session over a tuned TCPConnector, so connections, DNS
+    lookups and TLS sessions are reused by every store/location task, and
+    routes each request through the shared per-host RateLimiter.
+
+    Timeouts, connection errors and 5xx responses are retried with
+    exponential backoff and jitter, 429s after their Retry-After, and other
+    4xx responses are not retried. A per-host CircuitBreaker pauses all
+    requests to a host whose error rate spikes.
+
+        async with CrawlerClient(config, rate_limiter) as client:
+            response = await client.get(url)
+
+    With an `archive` (a ResponseArchive), every page fetched is recorded
+    for offline replay.
+    """
+
+    def __init__(self, config=None, rate_limiter=None, retry_policy=None, breaker_config=None, archive=None):
+        self.config = config or ClientConfig()
+        self.archive = archive
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker_config = breaker_config or BreakerConfig()
+        self.breakers = {}
+        self.session = None
+        self.requests = 0
+        self.bytes = 0
+        self.retries = Counter()
+        self.failures = 0
+
+    async def __aenter__(self):
+        config = self.config
+        connector = aiohttp.TCPConnector(
+            limit=config.connections,
+            limit_per_host=config.connections_per_host,
+            keepalive_timeout=config.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=config.dns_ttl,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=config.timeout, connect=config.connect_timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        if self.archive is not None:
+            self.archive.close()
+            logging.info(f"Recorded {self.archive.records} responses to {self.archive.path}")
+        logging.info(f"HTTP client: {self}")
+
+    def breaker_for(self, url):
+        host = urlsplit(url).netloc
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(host, self.breaker_config)
+        return breaker
+
+    async def get(self, url, headers=None) -> Response:
+        """
+        GET `url` with retries. Returns 304s with an empty body; raises
+        aiohttp.ClientResponseError for a final 4xx/5xx and the last transport
+        error once attempts are exhausted.
+        """
+        policy = self.retry_policy
+        breaker = self.breaker_for(url)
+        for attempt in range(1, policy.max_attempts + 1):
+            await breaker.wait()
+            ok = False
+            try:
+                response = await self._get_once(url, headers)
+                ok = True
+                return response
+            except aiohttp.ClientResponseError as e:
+                ok = not is_retryable(e.status)
+                if ok or attempt == policy.max_attempts:
+                    self.failures += 1
+                    metrics.HTTP_FAILURES.inc()
+                    raise
+                if e.status == 429:
+                    kind = '429'
+                    delay = policy.retry_after(e.headers.get('Retry-After') if e.headers else None, attempt)
+                else:
+                    kind = '5xx'
+                    delay = policy.backoff(attempt)
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                if attempt == policy.max_attempts:
+                    self.failures += 1
+                    metrics.HTTP_FAILURES.inc()
+                    raise
+                kind = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'connection'
+                delay = policy.backoff(attempt)
+            finally:
+                breaker.record(ok)
+
+            self.retries[kind] += 1
+            metrics.HTTP_RETRIES.labels(kind).inc()
+            logging.info(f"Retrying {url} after {kind} in {delay:.1f}s (attempt {attempt + 1}/{policy.max_attempts})")
+            await asyncio.sleep(delay)
+
+    async def _get_once(self, url, headers):
+        queued = time.perf_counter()
+        async with self.rate_limiter.slot(url) as slot:
+            start = time.perf_counter()
+            metrics.HTTP_RATE_LIMIT_WAIT_SECONDS.observe(start - queued)
+            async with self.session.get(url, headers=headers) as response:
+                slot.status = response.status
+                self.requests += 1
+                metrics.HTTP_RESPONSES.labels(response.status).inc()
+                response.raise_for_status()
+                if response.status == 304:
+                    metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start)
+                    return Response(response.status, response.headers, b'')
+                body = await response.read()
+                metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start)
+                self.bytes += len(body)
+                metrics.HTTP_RESPONSE_BYTES.inc(len(body))
+                metrics.HTTP_PAGE_BYTES.observe(len(body))
+                if self.archive is not None:
+                    self.archive.append(url, response.status, response.headers, body)
+                return Response(response.status, response.headers, body)
+
+    def __str__(self):
+        retries = ' '.join(f"{kind}={count}" for kind, count in self.retries.items()) or 'none'
+        trips = sum(breaker.trips for breaker in self.breakers.values())
+        return (
+            f"requests={self.requests} bytes={self.bytes} retries=[{retries}] "
+            f"failures={self.failures} breaker_trips={trips}"
+        )
+
+
+def sync_session(config=None):
+    """A pooled keep-alive requests.Session for the synchronous scraper."""
+    config = config or ClientConfig()
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=config.connections, pool_maxsize=config.connections_per_host)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(HEADERS)
+    return session
@@ -0,0 +1,132 @@
+import json
+import logging
+import sqlite3
+import time
+import uuid
+
+# Page states, in the order a subcategory page moves through them
+DISCOVERED = 'discovered'
+FETCHED = 'fetched'
+PARSED = 'parsed'
+COMMITTED = 'committed'
+
+
+class CrawlJournal:
+    """
+    Local SQLite journal of one crawl run.
+
+    Records the subcategory URLs discovered for each store/location and how
+    far each page got (fetched, parsed, committed), so `--resume <run-id>`
+    can skip the landing pages and every page whose products are already in
+    the database.
+    """
+
+    def __init__(self, path='crawl_journal.sqlite'):
+        self.path = path
+        self.run_id = None
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    targets TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    finished_at REAL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    run_id TEXT NOT NULL,
+                    store TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, store, location, url)
+                )
+                """
+            )
+
+    def start(self, stores, locations):
+        """Open a new run and return its id."""
+        self.run_id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, targets, started_at) VALUES (?, ?, ?)",
+                (self.run_id, json.dumps({'stores': stores, 'locations': locations}), time.time())
+            )
+        logging.info(f"Started crawl run {self.run_id}")
+        return self.run_id
+
+    def resume(self, run_id):
+        """Reopen an earlier run; returns its (stores, locations)."""
+        row = self._conn.execute("SELECT targets FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown crawl run {run_id}")
+        self.run_id = run_id
+        targets = json.loads(row[0])
+        logging.info(f"Resuming crawl run {run_id}: {self.pending_count()} unfinished pages")
+        return targets['stores'], targets['locations']
+
+    def add_links(self, store, location, links):
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO pages (run_id, store, location, url, state, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.run_id, store, location, url, DISCOVERED, now) for url in links]
+            )
+
+    def links(self, store, location):
+        """All subcategory URLs discovered for the store/location, or [] if none yet."""
+        return [url for url, in self._conn.execute(
+            "SELECT url FROM pages WHERE run_id = ? AND store = ? AND location = ?",
+            (self.run_id, store, location)
+        )]
+
+    def pending(self, store, location):
+        """URLs whose products have not been committed yet."""
+        return [url for url, in self._conn.execute(
+            "SELECT url FROM pages WHERE run_id = ? AND store = ? AND location = ? AND state != ?",
+            (self.run_id, store, location, COMMITTED)
+        )]
+
+    def pending_count(self):
+        return self._conn.execute(
+            "SELECT count(*) FROM pages WHERE run_id = ? AND state != ?",
+            (self.run_id, COMMITTED)
+        ).fetchone()[0]
+
+    def mark(self, store, location, urls, state):
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE pages SET state = ?, updated_at = ? WHERE run_id = ? AND store = ? AND location = ? AND url = ?",
+                [(state, now, self.run_id, store, location, url) for url in urls]
+            )
+
+    def finish(self, targets):
+        """
+        Close the run if every (store, location) target has discovered links
+        and every page is committed; returns the number of unfinished pages.
+        """
+        remaining = self.pending_count()
+        missing = [target for target in targets if not self.links(*target)]
+        if remaining == 0 and not missing:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), self.run_id)
+                )
+            logging.info(f"Crawl run {self.run_id} finished")
+        else:
+            logging.warning(
+                f"Crawl run {self.run_id} has {remaining} unfinished pages and {len(missing)} "
+                f"stores without subcategory links; continue it with --resume {self.run_id}"
+            )
+        return remaining
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,249 @@
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import combinations
+from sqlalchemy import delete, func, select, update
+from bulk_writer import chunked, dialect_insert
+
+# "6 x 1,5 l", "500g", "1 kg", "10 pz"
+_SIZE = re.compile(r'(?:(\d+)\s*x\s*)?(\d+(?:[.,]\d+)?)\s*(kg|gr|g|mg|lt|l|ml|cl|pz|pezzi)\b')
+_UNITS = {
+    'kg': ('g', 1000), 'gr': ('g', 1), 'g': ('g', 1), 'mg': ('g', 0.001),
+    'lt': ('ml', 1000), 'l': ('ml', 1000), 'cl': ('ml', 10), 'ml': ('ml', 1),
+    'pz': ('pz', 1), 'pezzi': ('pz', 1),
+}
+_WORDS = re.compile(r'[a-z0-9]+')
+
+BINS = 32   # one-permutation MinHash bins
+ROWS = 4    # bins per LSH band, so BINS // ROWS bands
+
+
+def normalize(name):
+    name = unicodedata.normalize('NFKD', name)
+    return ''.join(c for c in name if not unicodedata.combining(c)).casefold()
+
+
+def size_key(name):
+    """Total pack size in base units ('1500ml', '500g', ...) or '' when the name has none."""
+    match = _SIZE.search(normalize(name))
+    if match is None:
+        return ''
+    count, amount, unit = match.groups()
+    base, factor = _UNITS[unit]
+    total = int(count or 1) * float(amount.replace(',', '.')) * factor
+    return f"{round(total, 3):g}{base}"
+
+
+def shingles(name):
+    """Character trigrams of the name's words, with the pack size taken out."""
+    text = ' ' + ' '.join(_WORDS.findall(_SIZE.sub(' ', normalize(name)))) + ' '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def signature(grams, bins=BINS):
+    """
+    One-permutation MinHash: each trigram is hashed once and kept only if
+    it is the smallest in its bin; empty bins borrow from the next filled one.
+    """
+    mins = [None] * bins
+    for gram in grams:
+        h = zlib.crc32(gram.encode('utf-8'))
+        slot, value = h % bins, h // bins
+        if mins[slot] is None or value < mins[slot]:
+            mins[slot] = value
+    filled = [i for i, value in enumerate(mins) if value is not None]
+    if not filled:
+        return mins
+    for i in range(bins):
+        if mins[i] is None:
+            donor = next((j for j in filled if j > i), filled[0])
+            mins[i] = mins[donor] + (donor - i) % bins
+    return mins
+
+
+def buckets(size, sig, rows=ROWS):
+    """LSH bucket ids: one per band, blocked by pack size."""
+    return [
+        zlib.crc32(f"{size}|{band}|{sig[band * rows:(band + 1) * rows]}".encode('utf-8'))
+        for band in range(len(sig) // rows)
+    ]
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class MatchStats:
+    products: int = 0
+    candidates: int = 0
+    matched: int = 0
+    merged_clusters: int = 0
+
+    def __str__(self):
+        return (f"products={self.products} candidate_pairs={self.candidates} "
+                f"matched={self.matched} merged_clusters={self.merged_clusters}")
+
+
+class ProductMatcher:
+    """
+    Clusters the same item sold by different stores under one canonical
+    product id, in the product_matches table.
+
+    Products are blocked by pack size and bucketed with MinHash LSH over
+    the trigrams of their names, so only products sharing a bucket are ever
+    compared, and a pair is matched when the trigram Jaccard similarity is
+    at least `threshold`. Two products that both have prices in one store are
+    never merged: a store does not list the same item twice.
+
+    Runs are incremental: only products without a product_matches row are
+    hashed, and their buckets are looked up against the stored buckets of
+    everything matched before (product_match_keys). A cluster's canonical id
+    is its lowest product id.
+    """
+
+    def __init__(self, engine, metadata, threshold=0.7, max_bucket=50, chunk_size=5000):
+        self.engine = engine
+        self.threshold = threshold
+        self.max_bucket = max_bucket
+        self.chunk_size = chunk_size
+        self.products = metadata.tables['products']
+        self.prices = metadata.tables['product_prices']
+        self.matches = metadata.tables['product_matches']
+        self.keys = metadata.tables['product_match_keys']
+
+    def rebuild(self):
+        """Forget every match and recluster the whole catalog."""
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.keys))
+            conn.execute(delete(self.matches))
+        return self.run()
+
+    def run(self) -> MatchStats:
+        stats = MatchStats()
+        p, m, k = self.products, self.matches, self.keys
+        with self.engine.begin() as conn:
+            new = dict(conn.execute(
+                select(p.c.product_id, p.c.name)
+                .outerjoin(m, m.c.product_id == p.c.product_id)
+                .where(m.c.product_id.is_(None))
+            ).all())
+            stats.products = len(new)
+            if not new:
+                return stats
+
+            grams = {pid: shingles(name) for pid, name in new.items()}
+            keys = {pid: buckets(size_key(name), signature(grams[pid])) for pid, name in new.items()}
+
+            # Everything already matched that shares a bucket with a new product
+            members = defaultdict(set)
+            for pid, ids in keys.items():
+                for bucket in ids:
+                    members[bucket].add(pid)
+            for chunk in chunked(list(members), self.chunk_size):
+                for bucket, pid in conn.execute(select(k.c.bucket, k.c.product_id).where(k.c.bucket.in_(chunk))):
+                    members[bucket].add(pid)
+
+            pairs = set()
+            for ids in members.values():
+                if len(ids) > self.max_bucket:
+                    continue  # too generic to say anything
+                for a, b in combinations(sorted(ids), 2):
+                    if a in new or b in new:
+                        pairs.add((a, b))
+            stats.candidates = len(pairs)
+
+            old = {pid for pair in pairs for pid in pair if pid not in new}
+            for chunk in chunked(list(old), self.chunk_size):
+                for pid, name in conn.execute(select(p.c.product_id, p.c.name).where(p.c.product_id.in_(chunk))):
+                    grams[pid] = shingles(name)
+            edges = sorted(
+                ((jaccard(grams[a], grams[b]), a, b) for a, b in pairs),
+                reverse=True
+            )
+            edges = [edge for edge in edges if edge[0] >= self.threshold]
+
+            canonical, merges = self._cluster(conn, new, old, edges, stats)
+
+            now = datetime.utcnow()
+            for old_root, new_root in merges.items():
+                conn.execute(
+                    update(m).where(m.c.canonical_id == old_root)
+                    .values(canonical_id=new_root, matched_at=now)
+                )
+            rows = [{'product_id': pid, 'canonical_id': canonical[pid], 'matched_at': now} for pid in new]
+            for chunk in chunked(rows, self.chunk_size):
+                conn.execute(dialect_insert(self.engine, m).on_conflict_do_nothing(), chunk)
+            rows = [{'bucket': bucket, 'product_id': pid} for pid, ids in keys.items() for bucket in set(ids)]
+            for chunk in chunked(rows, self.chunk_size):
+                conn.execute(dialect_insert(self.engine, k).on_conflict_do_nothing(), chunk)
+        return stats
+
+    def _cluster(self, conn, new, old, edges, stats):
+        """
+        Union-find over new products and existing clusters. Returns the
+        canonical id of every new product and {old canonical: new canonical}
+        for existing clusters that were merged.
+        """
+        m = self.matches
+        # Existing clusters enter as one node, named by their canonical id
+        node = {pid: pid for pid in new}
+        for chunk in chunked(list(old), self.chunk_size):
+            for pid, canonical in conn.execute(
+                select(m.c.product_id, m.c.canonical_id).where(m.c.product_id.in_(chunk))
+            ):
+                node[pid] = canonical
+
+        stores = defaultdict(set)
+        roots = set(node.values())
+        existing = roots - set(new)
+        for chunk in chunked(list(new), self.chunk_size):
+            for pid, store_id in conn.execute(
+                select(self.prices.c.product_id, self.prices.c.store_id).where(self.prices.c.product_id.in_(chunk))
+            ):
+                stores[pid].add(store_id)
+        for chunk in chunked(list(existing), self.chunk_size):
+            for canonical, store_id in conn.execute(
+                select(m.c.canonical_id, self.prices.c.store_id)
+                .join(self.prices, self.prices.c.product_id == m.c.product_id)
+                .where(m.c.canonical_id.in_(chunk))
+                .distinct()
+            ):
+                stores[canonical].add(store_id)
+
+        parent = {root: root for root in roots}
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for _, a, b in edges:
+            ra, rb = find(node[a]), find(node[b])
+            if ra == rb or stores[ra] & stores[rb]:
+                continue
+            # The lower id stays the root, so roots are canonical ids
+            ra, rb = min(ra, rb), max(ra, rb)
+            parent[rb] = ra
+            stores[ra] |= stores.pop(rb)
+            stats.matched += 1
+
+        canonical = {pid: find(node[pid]) for pid in new}
+        merges = {root: find(root) for root in existing if find(root) != root}
+        stats.merged_clusters = len(merges)
+        return canonical, merges
+
+    def cluster_size_histogram(self):
+        """{cluster size: number of clusters}, for a quick look at match quality."""
+        m = self.matches
+        sizes = select(func.count().label('size')).select_from(m).group_by(m.c.canonical_id).subquery()
+        with self.engine.connect() as conn:
+            return dict(conn.execute(
+                select(sizes.c.size, func.count()).group_by(sizes.c.size).order_by(sizes.c.size)
+            ).all())
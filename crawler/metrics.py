@@ -0,0 +1,237 @@
+import bisect
+import logging
+import os
+import threading
+from aiohttp import web
+
+# Latency buckets in seconds, Prometheus' defaults stretched to 30s
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNTS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        # Unlabelled metrics record into a single child
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, _label_text(self.label_names, values)))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self.value = value
+
+    def render(self, name, labels):
+        return [f"{name}{labels} {_number(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def total(self):
+        return sum(child.value for child in self._children.values())
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def set(self, value):
+        self._default().set(value)
+
+
+class _Buckets:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def render(self, name, labels):
+        inner = labels[1:-1] + ',' if labels else ''
+        lines = []
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            lines.append(f'{name}_bucket{{{inner}le="{bound:g}"}} {seen}')
+        lines.append(f'{name}_bucket{{{inner}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{labels} {_number(self.sum)}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help, labels=(), buckets=SECONDS):
+        self.buckets = tuple(buckets)
+        super().__init__(registry, name, help, labels)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+
+class Registry:
+    """
+    Crawler metrics in the Prometheus text exposition format.
+
+    Kept dependency-free: the crawler only needs counters, gauges and
+    histograms, and their output can be scraped from `serve()` or picked up
+    by node_exporter's textfile collector from `write()`.
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        # Atomic replace, so a collector never reads a half-written file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    async def serve(self, host='0.0.0.0', port=9108):
+        """Serve /metrics from the running event loop; returns the AppRunner to clean up."""
+        async def handler(request):
+            return web.Response(text=self.render(), content_type='text/plain', charset='utf-8')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logging.info(f"Serving crawler metrics on http://{host}:{port}/metrics")
+        return runner
+
+    def summary(self):
+        """Short human-readable digest of every metric, for the end of a run."""
+        lines = []
+        for metric in self.metrics:
+            for values, child in sorted(metric._children.items()):
+                label = metric.name + _label_text(metric.label_names, values)
+                if isinstance(child, _Buckets):
+                    if not child.count:
+                        continue
+                    lines.append(
+                        f"{label:60s} n={child.count} mean={child.sum / child.count:.4g} "
+                        f"p50<={child.quantile(0.5):g} p99<={child.quantile(0.99):g}"
+                    )
+                elif child.value:
+                    lines.append(f"{label:60s} {_number(child.value)}")
+        return '\n'.join(lines)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = Histogram(
+    REGISTRY, 'crawler_http_request_seconds', 'Time from sending a request to reading its body'
+)
+HTTP_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    REGISTRY, 'crawler_http_rate_limit_wait_seconds', 'Time spent waiting for a rate limit slot'
+)
+HTTP_RESPONSES = Counter(REGISTRY, 'crawler_http_responses_total', 'HTTP responses by status code', ['status'])
+HTTP_RESPONSE_BYTES = Counter(REGISTRY, 'crawler_http_response_bytes_total', 'Decoded response body bytes')
+HTTP_PAGE_BYTES = Histogram(REGISTRY, 'crawler_http_page_bytes', 'Decoded size of each page', buckets=BYTES)
+HTTP_RETRIES = Counter(REGISTRY, 'crawler_http_retries_total', 'Retried requests by cause', ['reason'])
+HTTP_FAILURES = Counter(REGISTRY, 'crawler_http_failures_total', 'Requests that failed after all attempts')
+BREAKER_TRIPS = Counter(REGISTRY, 'crawler_breaker_trips_total', 'Times a host circuit breaker opened')
+
+STAGE_SECONDS = Histogram(
+    REGISTRY, 'crawler_stage_seconds', 'Time per item in each pipeline stage (fetch, parse, write)', ['stage']
+)
+STAGE_ERRORS = Counter(REGISTRY, 'crawler_stage_errors_total', 'Items dropped by a failing pipeline stage', ['stage'])
+QUEUE_DEPTH = Gauge(REGISTRY, 'crawler_queue_depth', 'Items waiting between pipeline stages', ['queue'])
+PAGES = Counter(REGISTRY, 'crawler_pages_total', 'Subcategory pages by outcome', ['result'])
+PAGE_PRODUCTS = Histogram(REGISTRY, 'crawler_page_products', 'Products parsed per page', buckets=COUNTS)
+DB_ROWS = Counter(REGISTRY, 'crawler_db_rows_total', 'Product rows per write outcome', ['result'])
+DB_BATCH_PRODUCTS = Histogram(
+    REGISTRY, 'crawler_db_batch_products', 'Products per DB write batch', buckets=COUNTS + (2500, 5000)
+)
+DB_STATEMENTS = Counter(REGISTRY, 'crawler_db_statements_total', 'SQL statements issued by batch writes')
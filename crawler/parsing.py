@@ -0,0 +1,228 @@
+"""
+HTML parsing for Glovo store pages.
+
+Runs inside ProcessPoolExecutor workers, so it takes raw page bytes and
+returns compact tuples instead of soup objects or dicts, and imports nothing
+from the crawler scripts. Three backends produce identical output:
+selectolax (fastest), lxml, and BeautifulSoup's html.parser as the fallback
+that is always available.
+"""
+import re
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+BACKENDS = ('selectolax', 'lxml', 'html.parser')
+
+
+def available_backends():
+    backends = []
+    if SelectolaxParser is not None:
+        backends.append('selectolax')
+    if lxml is not None:
+        backends.append('lxml')
+    backends.append('html.parser')
+    return backends
+
+
+def resolve_backend(name='auto'):
+    """Return the requested backend, or the fastest installed one for 'auto'."""
+    available = available_backends()
+    if name == 'auto':
+        return available[0]
+    if name not in available:
+        raise ValueError(f"Parser backend '{name}' is not installed (available: {', '.join(available)})")
+    return name
+
+
+def clean_product_name(name):
+    """
+    Removes any trailing ' - number' from the product name.
+
+    Examples:
+        "Product Name - 123" -> "Product Name"
+        "Another Product-456" -> "Another Product"
+    """
+    if not isinstance(name, str):
+        return name
+    # This regex looks for a hyphen followed by optional spaces and digits at the end of the string
+    return re.sub(r'\s*-\s*\d+$', '', name)
+
+
+def parse_price(raw_price):
+    """Convert '1,99 €' to 1.99; None if the price is missing or malformed."""
+    if raw_price is None:
+        return None
+    try:
+        return float(raw_price.replace('€', '').replace(',', '.').strip())
+    except ValueError:
+        return None
+
+
+def _product_record(sub_category_name, raw_name, raw_price, image_url):
+    price = parse_price(raw_price)
+    if price is None or price < 0.15 or price == 999:
+        return None
+    return (sub_category_name, clean_product_name(raw_name).title(), price, image_url)
+
+
+# --- html.parser (BeautifulSoup) ---
+
+def _text_bs4(parent, tag, class_name):
+    node = parent.find(tag, class_=class_name)
+    return node.get_text(strip=True) if node else None
+
+
+def _products_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    records = []
+    for grid in soup.find_all('div', class_='grid'):
+        sub_category_name = _text_bs4(grid, 'h2', 'grid__title') or 'N/A'
+        for item in grid.find_all('div', class_='tile'):
+            image = item.find('img', class_='tile__image')
+            record = _product_record(
+                sub_category_name,
+                _text_bs4(item, 'span', 'tile__description') or 'N/A',
+                _text_bs4(item, 'span', 'product-price__effective'),
+                image.get('src', 'N/A') if image else 'N/A',
+            )
+            if record:
+                records.append(record)
+    return records
+
+
+def _links_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for element in soup.find_all('div', {'class': 'carousel__content__element'}):
+        a_tag = element.find('a', href=True)
+        if a_tag:
+            links.append(a_tag['href'])
+    return links
+
+
+# --- selectolax ---
+
+def _text_selectolax(parent, selector):
+    node = parent.css_first(selector)
+    return node.text(deep=True, separator='', strip=True) if node else None
+
+
+def _products_selectolax(html):
+    tree = SelectolaxParser(html)
+    records = []
+    for grid in tree.css('div.grid'):
+        sub_category_name = _text_selectolax(grid, 'h2.grid__title') or 'N/A'
+        for item in grid.css('div.tile'):
+            image = item.css_first('img.tile__image')
+            record = _product_record(
+                sub_category_name,
+                _text_selectolax(item, 'span.tile__description') or 'N/A',
+                _text_selectolax(item, 'span.product-price__effective'),
+                image.attributes.get('src', 'N/A') if image else 'N/A',
+            )
+            if record:
+                records.append(record)
+    return records
+
+
+def _links_selectolax(html):
+    links = []
+    for element in SelectolaxParser(html).css('div.carousel__content__element'):
+        a_tag = element.css_first('a[href]')
+        if a_tag:
+            links.append(a_tag.attributes['href'])
+    return links
+
+
+# --- lxml ---
+
+def _class_xpath(tag, class_name):
+    return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+
+def _text_lxml(parent, tag, class_name):
+    nodes = parent.xpath(_class_xpath(tag, class_name))
+    if not nodes:
+        return None
+    return ''.join(text.strip() for text in nodes[0].itertext())
+
+
+def _products_lxml(html):
+    tree = lxml.html.fromstring(html)
+    records = []
+    for grid in tree.xpath(_class_xpath('div', 'grid')):
+        sub_category_name = _text_lxml(grid, 'h2', 'grid__title') or 'N/A'
+        for item in grid.xpath(_class_xpath('div', 'tile')):
+            images = item.xpath(_class_xpath('img', 'tile__image'))
+            record = _product_record(
+                sub_category_name,
+                _text_lxml(item, 'span', 'tile__description') or 'N/A',
+                _text_lxml(item, 'span', 'product-price__effective'),
+                images[0].get('src', 'N/A') if images else 'N/A',
+            )
+            if record:
+                records.append(record)
+    return records
+
+
+def _links_lxml(html):
+    links = []
+    for element in lxml.html.fromstring(html).xpath(_class_xpath('div', 'carousel__content__element')):
+        a_tags = element.xpath('.//a[@href]')
+        if a_tags:
+            links.append(a_tags[0].get('href'))
+    return links
+
+
+_PRODUCT_PARSERS = {
+    'selectolax': _products_selectolax,
+    'lxml': _products_lxml,
+    'html.parser': _products_bs4,
+}
+
+_LINK_PARSERS = {
+    'selectolax': _links_selectolax,
+    'lxml': _links_lxml,
+    'html.parser': _links_bs4,
+}
+
+
+def _decode(body):
+    if isinstance(body, bytes):
+        return body.decode('utf-8', errors='replace')
+    return body
+
+
+def parse_product_page(body, backend='html.parser'):
+    """
+    Parse a subcategory page into (sub_category, name, price, image_url) tuples.
+
+    Tiles without a usable price, or with Glovo's 999 placeholder, are skipped.
+    """
+    html = _decode(body)
+    if not html.strip():
+        return []
+    return _PRODUCT_PARSERS[backend](html)
+
+
+def parse_subcategory_links(body, base_url, backend='html.parser'):
+    """Parse a store landing page into absolute subcategory URLs."""
+    html = _decode(body)
+    if not html.strip():
+        return []
+    return [
+        link if link.startswith('http') else base_url + link
+        for link in _LINK_PARSERS[backend](html)
+    ]
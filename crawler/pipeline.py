@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+import metrics
+from bulk_writer import WriteStats
+
+# Marks the end of a stage's input; one is sent per downstream worker
+_DONE = object()
+
+
+class _MeteredQueue(asyncio.Queue):
+    """asyncio.Queue that reports its depth, summed over all pipelines, to crawler_queue_depth."""
+
+    def __init__(self, name, maxsize):
+        super().__init__(maxsize)
+        self.depth = metrics.QUEUE_DEPTH.labels(name)
+
+    def _put(self, item):
+        super()._put(item)
+        if item is not _DONE:
+            self.depth.inc()
+
+    def _get(self):
+        item = super()._get()
+        if item is not _DONE:
+            self.depth.dec()
+        return item
+
+
+@dataclass
+class PipelineConfig:
+    fetch_workers: int = 5
+    parse_workers: int = 2
+    write_workers: int = 1
+    queue_size: int = 10
+    batch_size: int = 1000
+
+
+@dataclass
+class PipelineStats:
+    pages: int = 0
+    skipped: int = 0
+    products: int = 0
+    batches: int = 0
+    errors: Counter = field(default_factory=Counter)
+    writes: WriteStats = field(default_factory=WriteStats)
+    # Seconds spent per item in each stage, for latency percentiles
+    timings: dict = field(default_factory=lambda: defaultdict(list))
+
+    def __str__(self):
+        errors = ' '.join(f"{stage}={count}" for stage, count in self.errors.items()) or 'none'
+        return (
+            f"pages={self.pages} skipped={self.skipped} products={self.products} batches={self.batches} "
+            f"errors=[{errors}] {self.writes}"
+        )
+
+
+class CrawlPipeline:
+    """
+    Streams subcategory links through fetch -> parse -> batch -> write.
+
+    Stages are connected by bounded asyncio.Queues, so a slow stage blocks the
+    ones upstream of it instead of letting pages or products pile up in memory,
+    and batches are written while later pages are still being fetched.
+
+    `fetch(link)` returns the page body, or None to skip an unchanged page,
+    `parse(link, body)` returns a list of product records and `write(batch)`
+    persists a batch and returns WriteStats. All three are coroutine functions.
+    The optional `on_committed(links)` is called once the products of those
+    pages have been written.
+    """
+
+    def __init__(self, fetch, parse, write, config=None, on_committed=None):
+        self.fetch = fetch
+        self.parse = parse
+        self.write = write
+        self.on_committed = on_committed
+        self.config = config or PipelineConfig()
+        self.stats = PipelineStats()
+
+    async def run(self, links) -> PipelineStats:
+        config = self.config
+        link_queue = _MeteredQueue('links', config.queue_size)
+        page_queue = _MeteredQueue('pages', config.queue_size)
+        product_queue = _MeteredQueue('products', config.queue_size)
+        batch_queue = _MeteredQueue('batches', config.queue_size)
+
+        await asyncio.gather(
+            self._produce(links, link_queue, config.fetch_workers),
+            self._stage('fetch', self._fetch_one, link_queue, page_queue,
+                        config.fetch_workers, config.parse_workers),
+            self._stage('parse', self._parse_one, page_queue, product_queue,
+                        config.parse_workers, 1),
+            self._batch(product_queue, batch_queue, config.write_workers),
+            self._stage('write', self._write_one, batch_queue, None,
+                        config.write_workers, 0),
+        )
+        return self.stats
+
+    async def _produce(self, links, outbox, downstream_workers):
+        for link in links:
+            await outbox.put(link)
+        for _ in range(downstream_workers):
+            await outbox.put(_DONE)
+
+    async def _stage(self, name, func, inbox, outbox, workers, downstream_workers):
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    return
+                start = time.perf_counter()
+                try:
+                    result = await func(item)
+                    elapsed = time.perf_counter() - start
+                    self.stats.timings[name].append(elapsed)
+                    metrics.STAGE_SECONDS.labels(name).observe(elapsed)
+                except Exception as e:
+                    self.stats.errors[name] += 1
+                    metrics.STAGE_ERRORS.labels(name).inc()
+                    logging.error(f"Pipeline {name} stage failed: {e}")
+                    continue
+                if outbox is not None and result is not None:
+                    await outbox.put(result)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        for _ in range(downstream_workers):
+            await outbox.put(_DONE)
+
+    async def _batch(self, inbox, outbox, downstream_workers):
+        # Pages are never split across batches, so a batch commits whole pages
+        batch, links = [], []
+        while True:
+            page = await inbox.get()
+            if page is _DONE:
+                break
+            link, products = page
+            batch.extend(products)
+            links.append(link)
+            if len(batch) >= self.config.batch_size:
+                await outbox.put((batch, links))
+                batch, links = [], []
+        if links:
+            await outbox.put((batch, links))
+        for _ in range(downstream_workers):
+            await outbox.put(_DONE)
+
+    async def _fetch_one(self, link):
+        body = await self.fetch(link)
+        if body is None:
+            self.stats.skipped += 1
+            metrics.PAGES.labels('unchanged').inc()
+            return None
+        self.stats.pages += 1
+        metrics.PAGES.labels('fetched').inc()
+        return link, body
+
+    async def _parse_one(self, page):
+        link, body = page
+        products = await self.parse(link, body)
+        self.stats.products += len(products)
+        metrics.PAGE_PRODUCTS.observe(len(products))
+        return link, products
+
+    async def _write_one(self, batch):
+        products, links = batch
+        if products:
+            writes = await self.write(products)
+            self.stats.writes += writes
+            self.stats.batches += 1
+            metrics.DB_BATCH_PRODUCTS.observe(len(products))
+            metrics.DB_STATEMENTS.inc(writes.statements)
+            for result in ('inserted', 'updated', 'unchanged', 'skipped'):
+                metrics.DB_ROWS.labels(result).inc(getattr(writes, result))
+        if self.on_committed is not None:
+            self.on_committed(links)
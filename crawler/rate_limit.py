@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+
+@dataclass
+class RateLimitConfig:
+    rate: float = 2.0             # initial requests/s per host
+    min_rate: float = 0.2
+    max_rate: float = 10.0
+    burst: int = 5                # bucket capacity
+    concurrency: int = 5          # in-flight requests per host
+    increase: float = 0.5         # additive increase, requests/s gained per second of success
+    decrease: float = 0.5         # multiplicative decrease on 429/5xx/errors
+    latency_target: float = 2.0   # seconds; a slower EWMA backs off gently
+    cooldown: float = 1.0         # minimum seconds between two decreases
+
+
+class Slot:
+    """Handed out by HostLimiter.slot(); set `status` once the response arrives."""
+    status = None
+
+
+class HostLimiter:
+    """
+    Token bucket for one host, with an AIMD controlled refill rate.
+
+    Successful fast responses raise the rate additively; 429, 5xx and
+    transport errors cut it multiplicatively, and a rising latency EWMA trims
+    it a little, so the crawl converges on the fastest rate the host tolerates.
+    """
+
+    def __init__(self, host, config):
+        self.host = host
+        self.config = config
+        self.rate = config.rate
+        self.tokens = float(config.burst)
+        self.latency = None
+        self.requests = 0
+        self.throttled = 0
+        self.failures = 0
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(config.concurrency)
+
+    def _refill(self, now):
+        self.tokens = min(self.config.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def _take_token(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._in_flight:
+            await self._take_token()
+            slot = Slot()
+            start = time.monotonic()
+            try:
+                yield slot
+            finally:
+                self._record(slot.status, time.monotonic() - start)
+
+    def _record(self, status, latency):
+        config = self.config
+        self.requests += 1
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+        if status is None or status == 429 or status >= 500:
+            if status == 429:
+                self.throttled += 1
+            else:
+                self.failures += 1
+            self._decrease(config.decrease)
+        elif self.latency > config.latency_target:
+            self._decrease(0.9)
+        else:
+            self.rate = min(config.max_rate, self.rate + config.increase / self.rate)
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        if now - self._last_decrease < self.config.cooldown:
+            return
+        self._last_decrease = now
+        self.rate = max(self.config.min_rate, self.rate * factor)
+        logging.info(f"Rate limit for {self.host} lowered to {self.rate:.2f} req/s")
+
+    def __str__(self):
+        latency = f"{self.latency:.2f}s" if self.latency is not None else "n/a"
+        return (
+            f"{self.host}: rate={self.rate:.2f}/s requests={self.requests} "
+            f"throttled={self.throttled} failures={self.failures} latency={latency}"
+        )
+
+
+class RateLimiter:
+    """Process-wide registry of per-host limiters, shared by every store task."""
+
+    def __init__(self, config=None):
+        self.config = config or RateLimitConfig()
+        self.hosts = {}
+
+    def for_url(self, url):
+        host = urlsplit(url).netloc
+        limiter = self.hosts.get(host)
+        if limiter is None:
+            limiter = self.hosts[host] = HostLimiter(host, self.config)
+        return limiter
+
+    def slot(self, url):
+        """
+        Wait for a request slot on the URL's host:
+
+            async with rate_limiter.slot(url) as slot:
+                async with session.get(url) as response:
+                    slot.status = response.status
+        """
+        return self.for_url(url).slot()
+
+    def __str__(self):
+        return '; '.join(str(limiter) for limiter in self.hosts.values()) or 'no requests'
@@ -0,0 +1,30 @@
+import sys
+
+# Fields of a scraped product, in the order of ProductRecord's slots
+FIELDS = ('link', 'sub_category', 'category', 'name', 'price', 'image_url')
+
+
+class ProductRecord:
+    """
+    One scraped product, from parse to write.
+
+    Slotted instead of a dict per tile, and the strings repeated across a
+    page or catalog (link, subcategory, category) are interned, so every
+    record of a grid shares one copy of them.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, link, sub_category, category, name, price, image_url):
+        self.link = sys.intern(link)
+        self.sub_category = sys.intern(sub_category)
+        self.category = sys.intern(category)
+        self.name = name
+        self.price = price
+        self.image_url = image_url
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __repr__(self):
+        return f"ProductRecord({', '.join(f'{field}={getattr(self, field)!r}' for field in FIELDS)})"
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import metrics
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay: float = 0.5       # seconds, doubled per attempt
+    max_delay: float = 30.0
+    max_retry_after: float = 120.0
+
+    def backoff(self, attempt):
+        """Exponential backoff with full jitter for the given (1-based) attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def retry_after(self, header, attempt):
+        """Delay requested by a 429's Retry-After header, falling back to backoff."""
+        delay = parse_retry_after(header)
+        if delay is None:
+            return self.backoff(attempt)
+        return min(delay, self.max_retry_after)
+
+
+def parse_retry_after(value):
+    """Seconds to wait for a Retry-After header given as delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_retryable(status):
+    """429 and 5xx are retried; every other 4xx is final."""
+    return status == 429 or status >= 500
+
+
+@dataclass
+class BreakerConfig:
+    window: int = 20              # recent requests considered
+    min_requests: int = 10        # don't trip on the first few errors of a run
+    error_rate: float = 0.5       # fraction of failures that opens the breaker
+    cooldown: float = 30.0        # seconds the host is paused once open
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker that pauses requests when the recent error rate spikes.
+
+    While open, `wait()` blocks callers until the cooldown ends instead of
+    failing them, so pages are delayed rather than lost. After the cooldown a
+    single caller goes through as a probe: success closes the breaker,
+    failure reopens it for another cooldown.
+    """
+
+    def __init__(self, host, config=None):
+        self.host = host
+        self.config = config or BreakerConfig()
+        self.outcomes = deque(maxlen=self.config.window)
+        self.state = 'closed'
+        self.opened_until = 0.0
+        self.trips = 0
+
+    async def wait(self):
+        while self.state != 'closed':
+            now = time.monotonic()
+            if self.state == 'open' and now >= self.opened_until:
+                self.state = 'half-open'  # this caller is the probe
+                return
+            await asyncio.sleep(max(self.opened_until - now, 0.1))
+
+    def record(self, ok):
+        if self.state == 'half-open':
+            if ok:
+                self.state = 'closed'
+                self.outcomes.clear()
+                logging.info(f"Circuit breaker closed for {self.host}")
+            else:
+                self._open()
+            return
+        if self.state == 'open':
+            return  # a request that was already in flight when the breaker opened
+
+        self.outcomes.append(ok)
+        failures = self.outcomes.count(False)
+        if (
+            not ok
+            and len(self.outcomes) >= self.config.min_requests
+            and failures / len(self.outcomes) >= self.config.error_rate
+        ):
+            logging.warning(
+                f"Circuit breaker open for {self.host}: {failures} failures "
+                f"in the last {len(self.outcomes)} requests"
+            )
+            self._open()
+
+    def _open(self):
+        self.trips += 1
+        metrics.BREAKER_TRIPS.inc()
+        self.state = 'open'
+        self.opened_until = time.monotonic() + self.config.cooldown
+        logging.warning(f"Pausing requests to {self.host} for {self.config.cooldown:.0f}s")
@@ -0,0 +1,134 @@
+import logging
+import math
+import sqlite3
+import time
+
+DAY = 86400.0
+
+
+class RecrawlScheduler:
+    """
+    Learns how often each subcategory page changes and picks the pages most
+    likely to be stale for the next run.
+
+    Every check of a page is recorded as changed or unchanged. Treating
+    changes as a Poisson process, the change rate is estimated with Cho and
+    Garcia-Molina's estimator for regular checks,
+    rate = -ln((n - X + 0.5) / (n + 0.5)) / mean interval, where X of n
+    intervals saw a change, which stays finite when every check saw one.
+    A page's staleness is then the probability it changed since its last
+    check, 1 - exp(-rate * age).
+
+    `plan()` keeps pages whose staleness reaches `threshold` (plus pages never
+    seen and pages older than `max_age`), most stale first, up to the run's
+    request budget.
+    """
+
+    def __init__(self, path='recrawl_schedule.sqlite', threshold=0.5, max_age=7 * DAY):
+        self.path = path
+        self.threshold = threshold
+        self.max_age = max_age
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    checks INTEGER NOT NULL,
+                    changes INTEGER NOT NULL,
+                    observed_seconds REAL NOT NULL,
+                    last_checked REAL NOT NULL
+                )
+                """
+            )
+        self.selected = 0
+        self.deferred = 0
+
+    def observe(self, url, changed, now=None):
+        """Record one check of `url`; `changed` is whether its content differed from the last commit."""
+        now = time.time() if now is None else now
+        row = self._conn.execute(
+            "SELECT checks, changes, observed_seconds, last_checked FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        with self._conn:
+            if row is None:
+                # The first check has no interval to learn from
+                self._conn.execute(
+                    "INSERT INTO pages (url, checks, changes, observed_seconds, last_checked) VALUES (?, 1, 0, 0, ?)",
+                    (url, now)
+                )
+            else:
+                checks, changes, observed, last_checked = row
+                self._conn.execute(
+                    "UPDATE pages SET checks = ?, changes = ?, observed_seconds = ?, last_checked = ? WHERE url = ?",
+                    (checks + 1, changes + bool(changed), observed + max(0.0, now - last_checked), now, url)
+                )
+
+    @staticmethod
+    def change_rate(intervals, changes, observed_seconds):
+        """Estimated changes per second, or None without a single observed interval."""
+        if intervals <= 0 or observed_seconds <= 0:
+            return None
+        mean_interval = observed_seconds / intervals
+        return -math.log((intervals - changes + 0.5) / (intervals + 0.5)) / mean_interval
+
+    def staleness(self, url, now=None):
+        """Probability that `url` changed since it was last checked (1.0 when unknown)."""
+        now = time.time() if now is None else now
+        row = self._conn.execute(
+            "SELECT checks, changes, observed_seconds, last_checked FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        return self._staleness(row, now)
+
+    def _staleness(self, row, now):
+        if row is None:
+            return 1.0
+        checks, changes, observed, last_checked = row
+        age = max(0.0, now - last_checked)
+        if age >= self.max_age:
+            return 1.0
+        rate = self.change_rate(checks - 1, changes, observed)
+        if rate is None:
+            return 1.0
+        return 1.0 - math.exp(-rate * age)
+
+    def plan(self, candidates, budget=None, now=None):
+        """
+        Choose the pages to crawl this run.
+
+        `candidates` maps each (store, location) to its subcategory URLs;
+        returns the same mapping restricted to the chosen URLs.
+        """
+        now = time.time() if now is None else now
+        rows = {
+            url: (checks, changes, observed, last_checked)
+            for url, checks, changes, observed, last_checked in self._conn.execute(
+                "SELECT url, checks, changes, observed_seconds, last_checked FROM pages"
+            )
+        }
+        scored = []
+        for target, urls in candidates.items():
+            for url in urls:
+                row = rows.get(url)
+                score = self._staleness(row, now)
+                if score >= self.threshold:
+                    last_checked = row[3] if row else 0.0
+                    scored.append((-score, last_checked, target, url))
+        scored.sort()
+        if budget is not None:
+            scored = scored[:budget]
+
+        chosen = {target: [] for target in candidates}
+        for _, _, target, url in scored:
+            chosen[target].append(url)
+        total = sum(len(urls) for urls in candidates.values())
+        self.selected += len(scored)
+        self.deferred += total - len(scored)
+        logging.info(f"Recrawl plan: {len(scored)} of {total} subcategory pages are due")
+        return chosen
+
+    def close(self):
+        self._conn.close()
+
+    def __str__(self):
+        return f"selected={self.selected} deferred={self.deferred}"
@@ -0,0 +1,167 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, select, update
+from bulk_writer import dialect_insert
+
+# Task states
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue:
+    """
+    Crawl work queue in the crawl_tasks table, shared by any number of
+    crawler processes and hosts.
+
+    One task is one subcategory page of a store/location. Workers lease
+    batches of pending tasks with SELECT ... FOR UPDATE SKIP LOCKED, so
+    concurrent workers never block on or double-lease the same rows, and mark
+    them done once their products are committed. A lease is only valid for
+    `visibility_timeout` seconds: a worker that dies or stalls loses its
+    tasks to the next lease call, and a task that has been leased
+    `max_attempts` times is parked as failed. Lease times come from the
+    worker's clock, so hosts need synchronised clocks.
+
+    SKIP LOCKED needs PostgreSQL; on SQLite the hint is dropped and writes are
+    serialised by the database lock instead, which is enough for a single host.
+    """
+
+    def __init__(self, engine, metadata, visibility_timeout=300, max_attempts=3):
+        self.engine = engine
+        self.tasks = metadata.tables['crawl_tasks']
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.leased = 0
+        self.completed = 0
+        self.released = 0
+        self.requeued = 0
+
+    def enqueue(self, run_id, store, location, urls):
+        """Add subcategory pages to a run; pages already queued are left alone."""
+        if not urls:
+            return 0
+        now = datetime.utcnow()
+        stmt = dialect_insert(self.engine, self.tasks).on_conflict_do_nothing(
+            index_elements=['run_id', 'store', 'location', 'url']
+        )
+        with self.engine.begin() as conn:
+            result = conn.execute(stmt, [
+                {'run_id': run_id, 'store': store, 'location': location, 'url': url,
+                 'state': PENDING, 'attempts': 0, 'updated_at': now}
+                for url in dict.fromkeys(urls)
+            ])
+        return result.rowcount
+
+    def requeue_expired(self, run_id):
+        """Return tasks whose lease ran out to the queue, or fail them after max_attempts."""
+        t = self.tasks
+        now = datetime.utcnow()
+        expired = and_(t.c.run_id == run_id, t.c.state == LEASED, t.c.lease_expires_at < now)
+        with self.engine.begin() as conn:
+            failed = conn.execute(
+                update(t).where(expired, t.c.attempts >= self.max_attempts)
+                .values(state=FAILED, leased_by=None, lease_expires_at=None,
+                        last_error='lease expired', updated_at=now)
+            ).rowcount
+            requeued = conn.execute(
+                update(t).where(expired)
+                .values(state=PENDING, leased_by=None, lease_expires_at=None, updated_at=now)
+            ).rowcount
+        if failed or requeued:
+            logging.warning(f"Work queue {run_id}: requeued {requeued} expired tasks, failed {failed}")
+        self.requeued += requeued
+        return requeued
+
+    def lease(self, run_id, worker_id, limit=50):
+        """Lease up to `limit` pending tasks; returns [(task_id, store, location, url)]."""
+        self.requeue_expired(run_id)
+        t = self.tasks
+        now = datetime.utcnow()
+        candidates = (
+            select(t.c.task_id)
+            .where(t.c.run_id == run_id, t.c.state == PENDING)
+            .order_by(t.c.task_id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(t)
+            .where(t.c.task_id.in_(candidates.scalar_subquery()))
+            .values(
+                state=LEASED,
+                leased_by=worker_id,
+                lease_expires_at=now + timedelta(seconds=self.visibility_timeout),
+                attempts=t.c.attempts + 1,
+                updated_at=now,
+            )
+            .returning(t.c.task_id, t.c.store, t.c.location, t.c.url)
+        )
+        with self.engine.begin() as conn:
+            tasks = [tuple(row) for row in conn.execute(stmt)]
+        self.leased += len(tasks)
+        return tasks
+
+    def heartbeat(self, task_ids, worker_id):
+        """Extend the lease on tasks this worker still holds."""
+        if not task_ids:
+            return 0
+        t = self.tasks
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(t)
+                .where(t.c.task_id.in_(task_ids), t.c.state == LEASED, t.c.leased_by == worker_id)
+                .values(lease_expires_at=now + timedelta(seconds=self.visibility_timeout), updated_at=now)
+            ).rowcount
+
+    def complete(self, task_ids, worker_id):
+        """Mark tasks done. Tasks whose lease was lost to another worker are not touched."""
+        if not task_ids:
+            return 0
+        t = self.tasks
+        with self.engine.begin() as conn:
+            done = conn.execute(
+                update(t)
+                .where(t.c.task_id.in_(task_ids), t.c.state == LEASED, t.c.leased_by == worker_id)
+                .values(state=DONE, lease_expires_at=None, updated_at=datetime.utcnow())
+            ).rowcount
+        self.completed += done
+        return done
+
+    def release(self, task_ids, worker_id, error=None):
+        """Give unfinished tasks back without waiting for their lease to expire."""
+        if not task_ids:
+            return 0
+        t = self.tasks
+        now = datetime.utcnow()
+        held = and_(t.c.task_id.in_(task_ids), t.c.state == LEASED, t.c.leased_by == worker_id)
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(t).where(held, t.c.attempts >= self.max_attempts)
+                .values(state=FAILED, leased_by=None, lease_expires_at=None, last_error=error, updated_at=now)
+            )
+            released = conn.execute(
+                update(t).where(held)
+                .values(state=PENDING, leased_by=None, lease_expires_at=None, last_error=error, updated_at=now)
+            ).rowcount
+        self.released += released
+        return released
+
+    def counts(self, run_id):
+        """{state: number of tasks} for the run."""
+        t = self.tasks
+        with self.engine.connect() as conn:
+            return dict(conn.execute(
+                select(t.c.state, func.count()).where(t.c.run_id == run_id).group_by(t.c.state)
+            ).all())
+
+    def drained(self, run_id):
+        """True once no task of the run is pending or leased."""
+        counts = self.counts(run_id)
+        return not counts.get(PENDING) and not counts.get(LEASED)
+
+    def __str__(self):
+        return (f"leased={self.leased} completed={self.completed} "
+                f"released={self.released} requeued={self.requeued}")
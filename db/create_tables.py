@@ -1,6 +1,6 @@
 import os
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint, TIMESTAMP
+    create_engine, Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, UniqueConstraint, TIMESTAMP
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
@@ -98,6 +98,45 @@ class ProductPrice(Base):
         UniqueConstraint('product_id', 'store_id', 'location_id', name='_price_uc'),
     )
 
+# Define the PriceHistory model: one row per actual price change
+class PriceHistory(Base):
+    __tablename__ = 'price_history'
+
+    history_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False)
+    store_id = Column(Integer, ForeignKey('stores.store_id', ondelete='CASCADE'), nullable=False)
+    location_id = Column(Integer, ForeignKey('locations.location_id', ondelete='CASCADE'), nullable=False)
+    price = Column(Float, nullable=False)
+    valid_from = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+
+    # Also serves (product, store, location) lookups ordered by valid_from
+    __table_args__ = (
+        UniqueConstraint('product_id', 'store_id', 'location_id', 'valid_from', name='_price_history_uc'),
+    )
+
+# Define the ProductMatch model: the canonical product each product is the same item as
+class ProductMatch(Base):
+    __tablename__ = 'product_matches'
+
+    product_id = Column(Integer, ForeignKey('products.product_id', ondelete='CASCADE'), primary_key=True)
+    canonical_id = Column(Integer, ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False, index=True)
+    matched_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+
+# Define the ProductMatchKey model: LSH buckets of every matched product
+class ProductMatchKey(Base):
+    __tablename__ = 'product_match_keys'
+
+    bucket = Column(BigInteger, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.product_id', ondelete='CASCADE'), primary_key=True)
+
+# Define the CacheVersion model: bumped when data the web app caches changes
+class CacheVersion(Base):
+    __tablename__ = 'cache_versions'
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+
 if __name__ == "__main__":
     # Create all tables
     Base.metadata.create_all(engine)
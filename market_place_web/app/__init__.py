@@ -12,6 +12,11 @@ app = Flask(__name__)
 
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Rendered pages: memory:// (per-process LRU) or redis://host:6379/0 (shared)
+app.config['PAGE_CACHE_URL'] = os.getenv('PAGE_CACHE_URL', 'memory://')
+app.config['PAGE_CACHE_TTL'] = float(os.getenv('PAGE_CACHE_TTL', 3600))
+app.config['PAGE_CACHE_MAX_ENTRIES'] = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 1000))
+app.config['PAGE_CACHE_MAX_BYTES'] = int(os.getenv('PAGE_CACHE_MAX_BYTES', 64 * 2 ** 20))
 
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
@@ -0,0 +1,121 @@
+"""
+Storage for the page cache, with no Flask imports.
+
+Every backend stores bytes with a TTL and holds render locks: `acquire()`
+takes a key's lock unless another holder has it, `release()` drops it.
+Locks are kept apart from the cached values, so evicting pages never drops
+a lock that is still held.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LRUBackend:
+    """Process-local LRU holding at most `max_entries` values and `max_bytes` of them."""
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 2 ** 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._locks = {}  # key -> expires_at, never evicted, only released or expired
+        self.size = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if len(value) > self.max_bytes:
+                return
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self.size += len(value)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def acquire(self, key, ttl):
+        """Take the render lock of `key` for at most `ttl` seconds; False while someone else holds it."""
+        with self._lock:
+            now = time.monotonic()
+            expires_at = self._locks.get(key)
+            if expires_at is not None and expires_at > now:
+                return False
+            self._locks[key] = now + ttl
+            # Drop locks whose holders never released them
+            if len(self._locks) > self.max_entries:
+                for stale in [k for k, t in self._locks.items() if t <= now]:
+                    del self._locks[stale]
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._locks.pop(key, None)
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self.size -= len(value)
+
+
+class RedisBackend:
+    """Shared backend over the Redis protocol; memory bounds come from the server's maxmemory policy."""
+
+    def __init__(self, url, prefix='page:'):
+        if redis is None:
+            raise RuntimeError("PAGE_CACHE_URL points to a Redis server but the redis package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def acquire(self, key, ttl):
+        lock = f"{self.prefix}lock:{key}"
+        return bool(self.client.set(lock, uuid.uuid4().hex, ex=max(1, int(ttl)), nx=True))
+
+    def release(self, key):
+        self.client.delete(f"{self.prefix}lock:{key}")
+
+
+def backend_from_url(url, max_entries=1000, max_bytes=64 * 2 ** 20):
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    if url.startswith('memory://'):
+        return LRUBackend(max_entries, max_bytes)
+    raise ValueError(f"Unsupported PAGE_CACHE_URL {url}")
+
+
+def wait_for_render(backend, key, lock_timeout, poll_interval=0.05):
+    """
+    Take the render lock of `key`, or wait for whoever holds it. Returns
+    (entry, locked): the value another caller stored meanwhile, or None and
+    whether this caller holds the lock and must render and release it.
+    """
+    if backend.acquire(key, lock_timeout):
+        return None, True
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        entry = backend.get(key)
+        if entry is not None:
+            return entry, False
+    return None, False
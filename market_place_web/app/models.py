@@ -1,5 +1,6 @@
 from app import db
-from sqlalchemy import UniqueConstraint, ForeignKey
+from sqlalchemy import UniqueConstraint, ForeignKey, text
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR, insert
 from datetime import datetime
 
 class Store(db.Model):
@@ -91,6 +92,109 @@ class ProductPrice(db.Model):
     def __repr__(self):
         return f'<ProductPrice {self.price} for Product {self.product.name} at Store {self.store.name} in {self.location.city}>'
 
+class PriceHistory(db.Model):
+    """Append-only log of price changes; ProductPrice holds the latest price."""
+    __tablename__ = 'price_history'
+    history_id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False)
+    store_id = db.Column(db.Integer, db.ForeignKey('stores.store_id', ondelete='CASCADE'), nullable=False)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.location_id', ondelete='CASCADE'), nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    valid_from = db.Column(db.TIMESTAMP, nullable=False, default=datetime.utcnow)
+    # Relationships
+    store = db.relationship('Store')
+    location = db.relationship('Location')
+
+    # Also serves (product, store, location) lookups ordered by valid_from
+    __table_args__ = (
+        UniqueConstraint('product_id', 'store_id', 'location_id', 'valid_from', name='_price_history_uc'),
+    )
+
+    def __repr__(self):
+        return f'<PriceHistory {self.price} for Product {self.product_id} from {self.valid_from}>'
+
+class ProductMatch(db.Model):
+    """Canonical product for each product, written by the crawler's cross-store matcher."""
+    __tablename__ = 'product_matches'
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete='CASCADE'), primary_key=True)
+    canonical_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False, index=True)
+    matched_at = db.Column(db.TIMESTAMP, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ProductMatch {self.product_id} -> {self.canonical_id}>'
+
+class ProductMatchKey(db.Model):
+    """LSH buckets of matched products, so matching can run incrementally."""
+    __tablename__ = 'product_match_keys'
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete='CASCADE'), primary_key=True)
+
+class ProductCatalog(db.Model):
+    """
+    Read-only listing rows from the product_catalog materialized view: one per
+    product and city, plus one per product over all cities (ALL_CITIES), each
+    over all stores (ALL_STORES) and per store. Refreshed after every crawl
+    and receipt upload.
+    """
+    __tablename__ = 'product_catalog'
+    __table_args__ = {'info': {'is_view': True}}
+    ALL_CITIES = 0
+    ALL_STORES = ''
+    # Italian stemming over unaccented words, created with the view's migration
+    SEARCH_CONFIG = 'italian_unaccent'
+
+    product_id = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer, primary_key=True)
+    store_name = db.Column(db.String, primary_key=True)
+    city = db.Column(db.String)
+    name = db.Column(db.String, nullable=False)
+    link = db.Column(db.String)
+    image_url = db.Column(db.String)
+    sub_category_name = db.Column(db.String, nullable=False)
+    category_name = db.Column(db.String, nullable=False)
+    min_price = db.Column(db.Float, nullable=False)
+    cheapest_store = db.Column(db.String, nullable=False)
+    offer_count = db.Column(db.Integer, nullable=False)
+    store_names = db.Column(ARRAY(db.String), nullable=False)
+    # Weighted name/subcategory/category document (GIN) and lower(unaccent(name)) for trigrams
+    search_document = db.Column(TSVECTOR, nullable=False)
+    search_name = db.Column(db.String, nullable=False)
+
+    @staticmethod
+    def refresh():
+        """Rebuild the view without blocking readers and bump the catalog version; commits the session."""
+        db.session.execute(text('REFRESH MATERIALIZED VIEW CONCURRENTLY product_catalog'))
+        CacheVersion.bump('catalog')
+        db.session.commit()
+
+    def __repr__(self):
+        return f'<ProductCatalog {self.name} from {self.min_price} at {self.cheapest_store}>'
+
+class CacheVersion(db.Model):
+    """Version counters of cached data; bumped by the crawler and /upload when that data changes."""
+    __tablename__ = 'cache_versions'
+    name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.TIMESTAMP, nullable=False, default=datetime.utcnow)
+
+    @staticmethod
+    def current(name):
+        return db.session.query(CacheVersion.version).filter_by(name=name).scalar() or 0
+
+    @staticmethod
+    def bump(name):
+        """Increment the version in the current transaction; the caller commits."""
+        now = datetime.utcnow()
+        db.session.execute(
+            insert(CacheVersion).values(name=name, version=1, updated_at=now).on_conflict_do_update(
+                index_elements=['name'],
+                set_={'version': CacheVersion.version + 1, 'updated_at': now}
+            )
+        )
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name} {self.version}>'
+
 class User(db.Model):
     __tablename__ = 'users'
 
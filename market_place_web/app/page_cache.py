@@ -0,0 +1,163 @@
+"""
+Versioned cache of rendered pages.
+
+Pages are keyed on the endpoint, the normalized route and query arguments,
+whether a user is logged in (the navbar differs), and the global 'catalog'
+data version. The crawler and /upload bump that version when they refresh
+the catalog, which makes every older entry unreachable at once; nothing has
+to be deleted.
+
+Backends (app/cache_backends.py): an in-memory LRU bounded by entries and
+bytes (per process), or any server speaking the Redis protocol (Redis,
+Valkey, KeyDB...), shared by every process, selected with
+PAGE_CACHE_URL=redis://host:6379/0.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+from flask import request, session, make_response
+from app import app
+from app.models import CacheVersion
+from app.cache_backends import backend_from_url, wait_for_render
+
+# cache_versions row bumped whenever product_catalog is refreshed
+CATALOG = 'catalog'
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def count(self, endpoint, result):
+        with self._lock:
+            per_endpoint = self.counts.setdefault(endpoint, {'hit': 0, 'miss': 0, 'coalesced': 0, 'error': 0})
+            per_endpoint[result] += 1
+
+    def as_dict(self):
+        with self._lock:
+            report = {}
+            for endpoint, counts in self.counts.items():
+                served = counts['hit'] + counts['coalesced'] + counts['miss']
+                report[endpoint] = dict(counts, hit_ratio=(counts['hit'] + counts['coalesced']) / served if served else 0.0)
+            return report
+
+
+class PageCache:
+    """
+    Serves repeated GETs of cached endpoints from `backend`.
+
+    On a miss only one request (per process with the LRU, across processes
+    with Redis) renders the page while holding a short lock entry; the
+    others wait for its result instead of all querying Postgres at once,
+    and render it themselves if it does not arrive within `lock_timeout`.
+    """
+
+    def __init__(self, backend, ttl=3600.0, check_interval=5.0, lock_timeout=10.0, poll_interval=0.05):
+        self.backend = backend
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.stats = CacheStats()
+        self._version_lock = threading.Lock()
+        self._version = None
+        self._checked = float('-inf')
+
+    def data_version(self):
+        """The catalog version, read from the database at most every `check_interval` seconds."""
+        now = time.monotonic()
+        with self._version_lock:
+            if now - self._checked >= self.check_interval:
+                self._version = CacheVersion.current(CATALOG)
+                self._checked = now
+            return self._version
+
+    def invalidate(self):
+        """Re-read the version on the next request, e.g. right after bumping it."""
+        with self._version_lock:
+            self._checked = float('-inf')
+
+    def key(self):
+        """Endpoint, version, login state and sorted non-empty arguments, hashed."""
+        arguments = sorted(
+            (name, value.strip())
+            for name, values in request.args.lists()
+            for value in values
+            if value.strip()
+        )
+        arguments += sorted((name, str(value)) for name, value in (request.view_args or {}).items())
+        raw = '|'.join((
+            request.endpoint,
+            str(self.data_version()),
+            'user' if session.get('user_id') else 'anonymous',
+            urlencode(arguments),
+        ))
+        return f"{request.endpoint}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            endpoint = request.endpoint
+            try:
+                key = self.key()
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self.stats.count(endpoint, 'hit')
+                    return self._response(entry, 'HIT')
+                entry, locked = wait_for_render(self.backend, key, self.lock_timeout, self.poll_interval)
+                if entry is not None:
+                    self.stats.count(endpoint, 'coalesced')
+                    return self._response(entry, 'HIT')
+            except Exception as e:
+                # A broken backend must not take the pages down with it
+                app.logger.warning(f"Page cache unavailable: {e}")
+                self.stats.count(endpoint, 'error')
+                return view(*args, **kwargs)
+
+            self.stats.count(endpoint, 'miss')
+            try:
+                response = make_response(view(*args, **kwargs))
+                # Redirects and errors (with their flashed messages) are never cached
+                if response.status_code == 200:
+                    content_type = response.headers.get('Content-Type', 'text/html; charset=utf-8')
+                    self._store(key, content_type.encode('latin-1') + b'\n' + response.get_data())
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            finally:
+                if locked:
+                    self._release(key)
+        return wrapper
+
+    def _store(self, key, entry):
+        try:
+            self.backend.set(key, entry, self.ttl)
+        except Exception as e:
+            app.logger.warning(f"Page cache unavailable: {e}")
+
+    def _release(self, key):
+        try:
+            self.backend.release(key)
+        except Exception as e:
+            app.logger.warning(f"Page cache unavailable: {e}")
+
+    @staticmethod
+    def _response(entry, status):
+        # Stored as "<content type>\n<body>": plain bytes, nothing to unpickle from a shared server
+        content_type, body = entry.split(b'\n', 1)
+        response = make_response(body)
+        response.headers['Content-Type'] = content_type.decode('latin-1')
+        response.headers['X-Cache'] = status
+        return response
+
+
+page_cache = PageCache(
+    backend_from_url(
+        app.config['PAGE_CACHE_URL'],
+        app.config['PAGE_CACHE_MAX_ENTRIES'],
+        app.config['PAGE_CACHE_MAX_BYTES'],
+    ),
+    ttl=app.config['PAGE_CACHE_TTL'],
+)
@@ -0,0 +1,117 @@
+import base64
+import binascii
+import json
+import time
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(ordering, direction, key):
+    """Opaque token for the rows after ('next') or before ('prev') `key` in `ordering`."""
+    raw = json.dumps([ordering, direction, list(key)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _fits(value, python_type):
+    """Whether a decoded key value can be compared with a column of `python_type`."""
+    if python_type is str:
+        return isinstance(value, str)
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def decode_cursor(token, ordering, types=None):
+    """
+    (direction, key) of a token made for `ordering`, or None for a missing or
+    unusable token. `types` are the Python types of the key columns; without
+    them every key value must be a number.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        token_ordering, direction, key = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        return None
+    # A token from another sort order (or search) points nowhere meaningful
+    if token_ordering != ordering or direction not in ('next', 'prev'):
+        return None
+    # Hand-made tokens must not reach SQL as mismatched types
+    if not isinstance(key, list):
+        return None
+    if types is None:
+        types = [float] * len(key)
+    if len(key) != len(types) or not all(_fits(value, t) for value, t in zip(key, types)):
+        return None
+    return direction, key
+
+
+def _after(order, key):
+    """Rows strictly after `key` in `order`, a list of (expression, descending)."""
+    clauses = []
+    for i, (expression, descending) in enumerate(order):
+        equal = [order[j][0] == key[j] for j in range(i)]
+        beyond = expression < key[i] if descending else expression > key[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def _python_type(expression):
+    try:
+        return expression.type.python_type
+    except NotImplementedError:
+        return float
+
+
+class KeysetPage:
+    """
+    One page of a keyset (seek) paginated query.
+
+    Pages are found with a WHERE on the sort key of the last (or first) row
+    shown instead of OFFSET, so with an index on the sort key any page costs
+    about as much as the first one. `order` is a list of (expression,
+    descending) ending in a unique column.
+    """
+
+    def __init__(self, query, order, ordering, cursor=None, per_page=20):
+        key_columns = [expression for expression, _ in order]
+        position = decode_cursor(cursor, ordering, [_python_type(expression) for expression in key_columns])
+        direction = position[0] if position else 'next'
+        if direction == 'prev':
+            # Walk backwards from the cursor, then put the rows back in order
+            order = [(expression, not descending) for expression, descending in order]
+        if position:
+            query = query.filter(_after(order, position[1]))
+        query = query.add_columns(*key_columns).order_by(
+            *(expression.desc() if descending else expression.asc() for expression, descending in order)
+        )
+        rows = query.limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction == 'prev':
+            rows.reverse()
+
+        self.items = [row[0] for row in rows]
+        keys = [tuple(row[1:]) for row in rows]
+        has_next = more if direction == 'next' else position is not None
+        has_prev = (position is not None) if direction == 'next' else more
+        self.next_cursor = encode_cursor(ordering, 'next', keys[-1]) if keys and has_next else None
+        self.prev_cursor = encode_cursor(ordering, 'prev', keys[0]) if keys and has_prev else None
+
+
+class CountCache:
+    """Result counts per filter combination, recomputed at most every `ttl` seconds."""
+
+    def __init__(self, ttl=300.0, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._counts = {}
+
+    def get(self, key, query):
+        now = time.monotonic()
+        entry = self._counts.get(key)
+        if entry is not None and now - entry[1] < self.ttl:
+            return entry[0]
+        if len(self._counts) >= self.max_entries:
+            self._counts.clear()
+        count = query.order_by(None).count()
+        self._counts[key] = (count, now)
+        return count
@@ -0,0 +1,65 @@
+import threading
+import time
+from app import db
+from app.models import Category, Store, Location, CacheVersion
+
+# cache_versions row bumped by the crawler's DimensionCache and by /upload
+REFERENCE_DATA = 'reference_data'
+
+
+class ReferenceCache:
+    """
+    Per-process cache of small, rarely changing lookup lists.
+
+    Entries expire after `ttl` seconds. Writers bump the shared version in
+    cache_versions when they add a store, location or category; every
+    process checks that version at most every `check_interval` seconds and
+    drops all its entries when it moved. Requests in between cost no query.
+    """
+
+    def __init__(self, name, loaders, ttl=600.0, check_interval=5.0):
+        self.name = name
+        self.loaders = loaders
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self._checked = float('-inf')
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked >= self.check_interval:
+                version = CacheVersion.current(self.name)
+                self._checked = now
+                if version != self._version:
+                    self._entries.clear()
+                    self._version = version
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            value = self.loaders[key]()
+            self._entries[key] = (value, now)
+            return value
+
+    def invalidate(self):
+        """Drop this process's entries now, e.g. right after bumping the version."""
+        with self._lock:
+            self._entries.clear()
+            self._checked = float('-inf')
+
+    def __str__(self):
+        return f"version={self._version} hits={self.hits} misses={self.misses}"
+
+
+# Plain rows rather than ORM objects, so cached values outlive the request's session
+reference_data = ReferenceCache(REFERENCE_DATA, {
+    'categories': lambda: db.session.query(Category.category_id, Category.name).order_by(Category.name.asc()).all(),
+    'stores': lambda: db.session.query(Store.store_id, Store.name).order_by(Store.name.asc()).all(),
+    'cities': lambda: db.session.query(Location.location_id, Location.city).order_by(Location.city.asc()).all(),
+})
@@ -1,8 +1,11 @@
 from flask import render_template, request, redirect, url_for, flash, session, jsonify
 from app import app, db
-from app.models import Product, ProductPrice, Store, Location, Category, SubCategory, User
-from sqlalchemy import asc, desc, func, or_
+from app.models import Product, ProductPrice, PriceHistory, ProductMatch, ProductCatalog, CacheVersion, Store, Location, Category, SubCategory, User
+from sqlalchemy import func, or_, cast, Float
 from sqlalchemy.orm import joinedload
+from app.pagination import KeysetPage, CountCache
+from app.reference_cache import reference_data, REFERENCE_DATA
+from app.page_cache import page_cache
 from flask import request, render_template
 from PIL import Image
 import io, re
@@ -17,78 +20,90 @@ tessdata_dir_config = "C:\\Users\\ygkep\\AppData\\Local\\Programs\\Tesseract-OCR
 config = f'{tessdata_dir_config}\\ita.traineddata'
 
 
+# Listing result counts, approximate by at most the TTL
+catalog_counts = CountCache(ttl=300)
+
+
 @app.route('/', methods=['GET'])
+@page_cache.cached
 def home():
     # Retrieve parameters with defaults
     query = request.args.get('query', '').strip()
-    order_by = request.args.get('order_by', 'asc').strip()
-    try:
-        page = int(request.args.get('page', 1))
-        if page < 1:
-            page = 1
-    except ValueError:
-        page = 1
+    order_by = request.args.get('order_by', 'relevance').strip()
+    # Opaque keyset tokens from the previous response, instead of page numbers
+    after = request.args.get('after', '').strip()
+    before = request.args.get('before', '').strip()
     per_page = 20  # Items per page
     category_filter = request.args.get('category', '').strip()
     store_filter = request.args.get('store', '').strip()
     city_filter = request.args.get('city', '').strip()
 
-    # Base query
-    products_query = Product.query
+    # Dropdown contents, cached until a crawl or upload adds a value
+    categories = reference_data.get('categories')
+    stores = reference_data.get('stores')
+    cities = reference_data.get('cities')
 
-    # Join necessary tables to enable filtering and searching
-    products_query = products_query.join(ProductPrice).join(Store).join(SubCategory).join(Category).join(Location)
+    # Precomputed listing rows; the price table is only read when the view is refreshed
+    products_query = ProductCatalog.query
 
-    # Eager load related data to optimize performance
-    products_query = products_query.options(
-        joinedload(Product.sub_category).joinedload(SubCategory.category),
-        joinedload(Product.prices).joinedload(ProductPrice.store),
-        joinedload(Product.prices).joinedload(ProductPrice.location)
-    )
-
-    # Apply city filter first
+    # Apply city filter first; without one, list each product once over all cities
     if city_filter:
-        products_query = products_query.filter(Location.city.ilike(city_filter))
+        # By location_id, the leading column of the listing index
+        location_ids = [city.location_id for city in cities if city.city.lower() == city_filter.lower()]
+        products_query = products_query.filter(ProductCatalog.location_id.in_(location_ids))
+    else:
+        products_query = products_query.filter(ProductCatalog.location_id == ProductCatalog.ALL_CITIES)
 
     # Apply full-text search if query is provided
     if query:
-        # Create a full-text search vector
-        search_vector = func.to_tsvector('english', func.concat_ws(' ', Product.name, SubCategory.name, Category.name))
-        # Create a search query
-        search_query = func.plainto_tsquery('english', query)
-        # Filter products matching the search query
-        products_query = products_query.filter(search_vector.op('@@')(search_query))
+        # Stemmed words against the stored, GIN-indexed search document
+        search_query = func.plainto_tsquery(ProductCatalog.SEARCH_CONFIG, query)
+        # Partial or misspelled words against the trigram-indexed name
+        search_term = func.lower(func.unaccent(query))
+        products_query = products_query.filter(or_(
+            ProductCatalog.search_document.op('@@')(search_query),
+            search_term.op('<%')(ProductCatalog.search_name)
+        ))
 
     # Apply category filter if selected
     if category_filter:
-        products_query = products_query.filter(Category.name.ilike(category_filter))
+        products_query = products_query.filter(ProductCatalog.category_name.ilike(category_filter))
 
-    # Apply store filter if selected
+    # Apply store filter if selected: that store's own rows, so its price is the one shown
+    # (store names are stored lowercase)
     if store_filter:
-        products_query = products_query.filter(Store.name.ilike(store_filter))
-
-    # Aggregate to get the minimum price per product
-    products_query = products_query.add_columns(func.min(ProductPrice.price).label('min_price'))
+        products_query = products_query.filter(ProductCatalog.store_name == store_filter.lower())
+    else:
+        products_query = products_query.filter(ProductCatalog.store_name == ProductCatalog.ALL_STORES)
 
-    # Group by product to handle aggregation
-    products_query = products_query.group_by(Product.product_id)
+    # Counted once per filter combination every few minutes, not on every page
+    total_count = catalog_counts.get((city_filter, query, category_filter, store_filter), products_query)
 
-    # Apply ordering based on price
+    # Apply ordering: best matches first when searching, otherwise by price.
+    # Each ends in product_id so the keyset is unique.
     if order_by == 'desc':
-        products_query = products_query.order_by(desc('min_price'))
+        ordering = 'desc'
+        # Both descending, so the (location_id, min_price, product_id) index is read backwards
+        order = [(ProductCatalog.min_price, True), (ProductCatalog.product_id, True)]
+    elif order_by == 'relevance' and query:
+        # Ranks depend on the search terms, so tokens are only valid for the same query
+        ordering = f'relevance:{query}'
+        # Both return real; as double precision the cursor's JSON floats compare exactly
+        order = [
+            (cast(func.ts_rank_cd(ProductCatalog.search_document, search_query), Float(precision=53)), True),
+            (cast(func.word_similarity(search_term, ProductCatalog.search_name), Float(precision=53)), True),
+            (ProductCatalog.min_price, False),
+            (ProductCatalog.product_id, False),
+        ]
     else:
-        products_query = products_query.order_by(asc('min_price'))
+        ordering = 'asc'
+        order = [(ProductCatalog.min_price, False), (ProductCatalog.product_id, False)]
 
-    # Paginate the results
-    products_pagination = products_query.paginate(page=page, per_page=per_page, error_out=False)
-
-    # Retrieve distinct categories, stores, and cities for the dropdowns
-    categories = Category.query.order_by(Category.name.asc()).all()
-    stores = Store.query.order_by(Store.name.asc()).all()
-    cities = Location.query.order_by(Location.city.asc()).all()
+    # Seek past the cursor's row instead of OFFSET, so every page costs the same
+    products_page = KeysetPage(products_query, order, ordering, before or after, per_page)
 
     return render_template('index.html', 
-                           products=products_pagination.items, 
+                           products=products_page.items, 
                            categories=categories, 
                            stores=stores,
                            cities=cities,
@@ -96,11 +111,13 @@ def home():
                            selected_category=category_filter, 
                            selected_store=store_filter, 
                            selected_city=city_filter, 
-                           page=page,
-                           total_pages=products_pagination.pages,
+                           next_cursor=products_page.next_cursor,
+                           prev_cursor=products_page.prev_cursor,
+                           total_count=total_count,
                            query=query)
 from flask import render_template, request, redirect, url_for, flash
 @app.route('/compare', methods=['GET'])
+@page_cache.cached
 def compare():
     product_ids = request.args.getlist('compare_products')
     if not product_ids:
@@ -132,13 +149,32 @@ def compare():
 
 # Route to display a single product's details
 @app.route('/product/<int:product_id>')
+@page_cache.cached
 def product_detail(product_id):
     product = Product.query.options(
         joinedload(Product.sub_category).joinedload(SubCategory.category),
         joinedload(Product.prices).joinedload(ProductPrice.store),
         joinedload(Product.prices).joinedload(ProductPrice.location)
     ).get_or_404(product_id)
-    return render_template('product_detail.html', product=product)
+    # Served by the _price_history_uc index, no scan of the history table
+    price_history = PriceHistory.query.options(
+        joinedload(PriceHistory.store),
+        joinedload(PriceHistory.location)
+    ).filter_by(product_id=product_id).order_by(PriceHistory.valid_from.desc()).limit(50).all()
+    # Prices of the same item listed under other products by other stores
+    matched_prices = []
+    match = db.session.get(ProductMatch, product_id)
+    if match is not None:
+        matched_prices = ProductPrice.query.options(
+            joinedload(ProductPrice.product),
+            joinedload(ProductPrice.store),
+            joinedload(ProductPrice.location)
+        ).join(ProductMatch, ProductMatch.product_id == ProductPrice.product_id).filter(
+            ProductMatch.canonical_id == match.canonical_id,
+            ProductPrice.product_id != product_id
+        ).order_by(ProductPrice.price.asc()).all()
+    return render_template('product_detail.html', product=product, price_history=price_history,
+                           matched_prices=matched_prices)
 
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -283,6 +319,7 @@ def upload_image():
         store = Store(name=store_name.lower())
         db.session.add(store)
         db.session.flush()  # To get the store_id
+        CacheVersion.bump(REFERENCE_DATA)
     
     # Handle the receipt date
     receipt_date_str = receipt_data.get('date', '').strip()
@@ -298,6 +335,7 @@ def upload_image():
         category = Category(name='Uncategorized')
         db.session.add(category)
         db.session.flush()  # To get category_id
+        CacheVersion.bump(REFERENCE_DATA)
 
     sub_category = SubCategory.query.filter_by(name='Uncategorized', category_id=category.category_id).first()
     if not sub_category:
@@ -311,6 +349,7 @@ def upload_image():
         location = Location(city='Napoli', country='Italy')
         db.session.add(location)
         db.session.flush()  # To get location_id
+        CacheVersion.bump(REFERENCE_DATA)
 
     # Handle the items
     items = receipt_data.get('items', [])
@@ -350,12 +389,21 @@ def upload_image():
             if product_price:
                 # Compare last_updated dates
                 if product_price.last_updated < receipt_date:
-                    # Update price and last_updated
+                    # last_updated is when the price was last seen, so a newer
+                    # receipt moves it even when the price is the same
+                    product_price.last_updated = receipt_date
+                    db.session.add(product_price)
+                    # Only a real price change is logged in the history
                     if product_price.price != price:
                         product_price.price = price
+                        db.session.add(PriceHistory(
+                            product_id=product.product_id,
+                            store_id=store.store_id,
+                            location_id=location.location_id,
+                            price=price,
+                            valid_from=receipt_date
+                        ))
                         feedback_messages.append(f"Price updated to '{price}' for product '{product_name}'")
-                    product_price.last_updated = receipt_date
-                    db.session.add(product_price)
                 else:
                     # The existing price is more recent, do nothing
                     feedback_messages.append(f"Price '{price}' for product '{product_name}' is older than the existing price")
@@ -370,6 +418,13 @@ def upload_image():
                     last_updated=receipt_date
                 )
                 db.session.add(product_price)
+                db.session.add(PriceHistory(
+                    product_id=product.product_id,
+                    store_id=store.store_id,
+                    location_id=location.location_id,
+                    price=price,
+                    valid_from=receipt_date
+                ))
                 feedback_messages.append(f"New price '{price}' added for product '{product_name}'")
         else:
             # Product does not exist, create a new one
@@ -391,21 +446,42 @@ def upload_image():
                 last_updated=receipt_date
             )
             db.session.add(product_price)
+            db.session.add(PriceHistory(
+                product_id=product.product_id,
+                store_id=store.store_id,
+                location_id=location.location_id,
+                price=price,
+                valid_from=receipt_date
+            ))
             feedback_messages.append(f"New product '{product_name}' added to the database")
     
     try:
         db.session.commit()
-        return jsonify({
-            'message': 'Data inserted/updated successfully',
-            'feedback': feedback_messages
-        }), 200
     except Exception as e:
         db.session.rollback()
         print(f"Error inserting/updating the database: {e}")
         return jsonify({'error': 'Database operation failed'}), 500
+    # Other processes see the bumped version within a few seconds; this one right away
+    reference_data.invalidate()
+    try:
+        ProductCatalog.refresh()
+        page_cache.invalidate()
+    except Exception as e:
+        # The prices are saved; the listing catches up on the next refresh
+        db.session.rollback()
+        print(f"Error refreshing the product catalog: {e}")
+    return jsonify({
+        'message': 'Data inserted/updated successfully',
+        'feedback': feedback_messages
+    }), 200
     
     
     
+@app.route('/cache_stats')
+def cache_stats():
+    # Hits, misses, coalesced waits and hit ratio per cached page, for this process
+    return jsonify(page_cache.stats.as_dict())
+
 @app.route('/checkout')
 def checkout():
     return render_template('checkout.html')
@@ -436,7 +512,6 @@ def get_cart_products():
         products_data.append(product_info)
 
     # Get a list of all stores
-    stores = Store.query.all()
-    store_names = [store.name for store in stores]
+    store_names = [store.name for store in reference_data.get('stores')]
 
     return jsonify({'products': products_data, 'stores': store_names})
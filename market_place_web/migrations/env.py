@@ -94,6 +94,13 @@ def run_migrations_online():
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
+    # Views are mapped for reading but created by hand-written migrations
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == 'table' and object.info.get('is_view'))
+
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
+
     connectable = get_engine()
 
     with connectable.connect() as connection:
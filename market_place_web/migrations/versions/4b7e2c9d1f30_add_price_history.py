@@ -0,0 +1,46 @@
+"""Add price_history table
+
+Revision ID: 4b7e2c9d1f30
+Revises: 1d8f83667aaa
+Create Date: 2026-10-18 18:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2c9d1f30'
+down_revision = '1d8f83667aaa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The crawlers' create_all may have created the table already
+    if not sa.inspect(op.get_bind()).has_table('price_history'):
+        op.create_table('price_history',
+        sa.Column('history_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('store_id', sa.Integer(), nullable=False),
+        sa.Column('location_id', sa.Integer(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('valid_from', sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(['location_id'], ['locations.location_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.product_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['store_id'], ['stores.store_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('history_id'),
+        sa.UniqueConstraint('product_id', 'store_id', 'location_id', 'valid_from', name='_price_history_uc')
+        )
+
+    # Seed the history with the current prices that have none yet
+    op.execute(
+        "INSERT INTO price_history (product_id, store_id, location_id, price, valid_from) "
+        "SELECT pp.product_id, pp.store_id, pp.location_id, pp.price, pp.last_updated FROM product_prices pp "
+        "WHERE NOT EXISTS (SELECT 1 FROM price_history h WHERE h.product_id = pp.product_id "
+        "AND h.store_id = pp.store_id AND h.location_id = pp.location_id)"
+    )
+
+
+def downgrade():
+    op.drop_table('price_history')
@@ -0,0 +1,49 @@
+"""Add product_matches and product_match_keys tables
+
+Revision ID: 7c3a9e1b5d42
+Revises: 4b7e2c9d1f30
+Create Date: 2026-10-18 18:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3a9e1b5d42'
+down_revision = '4b7e2c9d1f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # fast_crawler's create_all may have created either table already
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('product_matches'):
+        op.create_table('product_matches',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('canonical_id', sa.Integer(), nullable=False),
+        sa.Column('matched_at', sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(['canonical_id'], ['products.product_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.product_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('product_id')
+        )
+    if 'ix_product_matches_canonical_id' not in {index['name'] for index in inspector.get_indexes('product_matches')}:
+        with op.batch_alter_table('product_matches', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_product_matches_canonical_id'), ['canonical_id'], unique=False)
+
+    if not inspector.has_table('product_match_keys'):
+        op.create_table('product_match_keys',
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.product_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('bucket', 'product_id')
+        )
+
+
+def downgrade():
+    op.drop_table('product_match_keys')
+    with op.batch_alter_table('product_matches', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_matches_canonical_id'))
+
+    op.drop_table('product_matches')
@@ -0,0 +1,64 @@
+"""Add product_catalog materialized view
+
+Revision ID: 9e4f1a7c2b63
+Revises: 7c3a9e1b5d42
+Create Date: 2026-10-18 19:20:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4f1a7c2b63'
+down_revision = '7c3a9e1b5d42'
+branch_labels = None
+depends_on = None
+
+
+# One row per product and city, plus one per product over all cities (location_id 0)
+CATALOG_VIEW = """
+CREATE MATERIALIZED VIEW product_catalog AS
+SELECT
+    offers.product_id,
+    offers.location_id,
+    offers.city,
+    p.name,
+    p.link,
+    p.image_url,
+    sc.name AS sub_category_name,
+    c.name AS category_name,
+    offers.min_price,
+    offers.cheapest_store,
+    offers.offer_count,
+    offers.store_names
+FROM (
+    SELECT
+        pp.product_id,
+        coalesce(l.location_id, 0) AS location_id,
+        l.city,
+        min(pp.price) AS min_price,
+        (array_agg(s.name ORDER BY pp.price, s.name))[1] AS cheapest_store,
+        count(*) AS offer_count,
+        array_agg(DISTINCT s.name) AS store_names
+    FROM product_prices pp
+    JOIN stores s ON s.store_id = pp.store_id
+    JOIN locations l ON l.location_id = pp.location_id
+    GROUP BY GROUPING SETS ((pp.product_id), (pp.product_id, l.location_id, l.city))
+) offers
+JOIN products p ON p.product_id = offers.product_id
+JOIN sub_categories sc ON sc.sub_category_id = p.sub_category_id
+JOIN categories c ON c.category_id = sc.category_id
+WITH DATA
+"""
+
+
+def upgrade():
+    op.execute(CATALOG_VIEW)
+    # REFRESH ... CONCURRENTLY needs a unique index over plain columns
+    op.execute("CREATE UNIQUE INDEX ix_product_catalog_product_location ON product_catalog (product_id, location_id)")
+    # The listing: one city (or all of them) ordered by price
+    op.execute("CREATE INDEX ix_product_catalog_location_price ON product_catalog (location_id, min_price, product_id)")
+
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS product_catalog")
@@ -0,0 +1,112 @@
+"""Add an Italian search document and trigram name to product_catalog
+
+Revision ID: b2d8e6f0a917
+Revises: 9e4f1a7c2b63
+Create Date: 2026-10-18 19:50:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d8e6f0a917'
+down_revision = '9e4f1a7c2b63'
+branch_labels = None
+depends_on = None
+
+
+OFFERS = """
+    SELECT
+        pp.product_id,
+        coalesce(l.location_id, 0) AS location_id,
+        l.city,
+        min(pp.price) AS min_price,
+        (array_agg(s.name ORDER BY pp.price, s.name))[1] AS cheapest_store,
+        count(*) AS offer_count,
+        array_agg(DISTINCT s.name) AS store_names
+    FROM product_prices pp
+    JOIN stores s ON s.store_id = pp.store_id
+    JOIN locations l ON l.location_id = pp.location_id
+    GROUP BY GROUPING SETS ((pp.product_id), (pp.product_id, l.location_id, l.city))
+"""
+
+# Name weighs most, then subcategory, then category. unaccent() is not
+# immutable, which rules out generated columns and expression indexes but
+# not a materialized view, where the document is computed once per refresh.
+CATALOG_VIEW = f"""
+CREATE MATERIALIZED VIEW product_catalog AS
+SELECT
+    offers.product_id,
+    offers.location_id,
+    offers.city,
+    p.name,
+    p.link,
+    p.image_url,
+    sc.name AS sub_category_name,
+    c.name AS category_name,
+    offers.min_price,
+    offers.cheapest_store,
+    offers.offer_count,
+    offers.store_names,
+    setweight(to_tsvector('italian_unaccent', p.name), 'A')
+        || setweight(to_tsvector('italian_unaccent', sc.name), 'B')
+        || setweight(to_tsvector('italian_unaccent', c.name), 'C') AS search_document,
+    lower(unaccent(p.name)) AS search_name
+FROM ({OFFERS}) offers
+JOIN products p ON p.product_id = offers.product_id
+JOIN sub_categories sc ON sc.sub_category_id = p.sub_category_id
+JOIN categories c ON c.category_id = sc.category_id
+WITH DATA
+"""
+
+PREVIOUS_CATALOG_VIEW = f"""
+CREATE MATERIALIZED VIEW product_catalog AS
+SELECT
+    offers.product_id,
+    offers.location_id,
+    offers.city,
+    p.name,
+    p.link,
+    p.image_url,
+    sc.name AS sub_category_name,
+    c.name AS category_name,
+    offers.min_price,
+    offers.cheapest_store,
+    offers.offer_count,
+    offers.store_names
+FROM ({OFFERS}) offers
+JOIN products p ON p.product_id = offers.product_id
+JOIN sub_categories sc ON sc.sub_category_id = p.sub_category_id
+JOIN categories c ON c.category_id = sc.category_id
+WITH DATA
+"""
+
+
+def create_listing_indexes():
+    op.execute("CREATE UNIQUE INDEX ix_product_catalog_product_location ON product_catalog (product_id, location_id)")
+    op.execute("CREATE INDEX ix_product_catalog_location_price ON product_catalog (location_id, min_price, product_id)")
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Italian stemming of accent-free words: "caffè" and "caffe" both match
+    op.execute("CREATE TEXT SEARCH CONFIGURATION italian_unaccent (COPY = italian)")
+    op.execute(
+        "ALTER TEXT SEARCH CONFIGURATION italian_unaccent "
+        "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, italian_stem"
+    )
+
+    op.execute("DROP MATERIALIZED VIEW product_catalog")
+    op.execute(CATALOG_VIEW)
+    create_listing_indexes()
+    op.execute("CREATE INDEX ix_product_catalog_search_document ON product_catalog USING gin (search_document)")
+    # Partial and misspelled terms, through the word_similarity operator <%
+    op.execute("CREATE INDEX ix_product_catalog_search_name ON product_catalog USING gin (search_name gin_trgm_ops)")
+
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW product_catalog")
+    op.execute(PREVIOUS_CATALOG_VIEW)
+    create_listing_indexes()
+    op.execute("DROP TEXT SEARCH CONFIGURATION italian_unaccent")
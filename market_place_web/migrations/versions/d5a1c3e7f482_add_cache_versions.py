@@ -0,0 +1,38 @@
+"""Add cache_versions table
+
+Revision ID: d5a1c3e7f482
+Revises: b2d8e6f0a917
+Create Date: 2026-10-18 20:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a1c3e7f482'
+down_revision = 'b2d8e6f0a917'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The crawlers' create_all may have created the table already
+    if not sa.inspect(op.get_bind()).has_table('cache_versions'):
+        op.create_table('cache_versions',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+        )
+
+    # Start every counter the web app reads, keeping any a crawler already bumped
+    op.execute(
+        "INSERT INTO cache_versions (name, version, updated_at) "
+        "VALUES ('catalog', 0, CURRENT_TIMESTAMP), ('reference_data', 0, CURRENT_TIMESTAMP) "
+        "ON CONFLICT (name) DO NOTHING"
+    )
+
+
+def downgrade():
+    op.drop_table('cache_versions')
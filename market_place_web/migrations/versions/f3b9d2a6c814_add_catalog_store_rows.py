@@ -0,0 +1,101 @@
+"""Add per-store rows to product_catalog
+
+Revision ID: f3b9d2a6c814
+Revises: d5a1c3e7f482
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9d2a6c814'
+down_revision = 'd5a1c3e7f482'
+branch_labels = None
+depends_on = None
+
+
+def catalog_view(per_store):
+    """
+    product_catalog with one row per product and city plus one over all
+    cities (location_id 0); with `per_store`, each of those also per store,
+    store_name '' being the row over all stores.
+    """
+    if per_store:
+        store_name = "coalesce(s.name, '') AS store_name,"
+        grouping = (
+            "(pp.product_id), (pp.product_id, l.location_id, l.city), "
+            "(pp.product_id, s.name), (pp.product_id, l.location_id, l.city, s.name)"
+        )
+        outer_store_name = "offers.store_name,"
+    else:
+        store_name = outer_store_name = ""
+        grouping = "(pp.product_id), (pp.product_id, l.location_id, l.city)"
+    return f"""
+CREATE MATERIALIZED VIEW product_catalog AS
+SELECT
+    offers.product_id,
+    offers.location_id,
+    offers.city,
+    {outer_store_name}
+    p.name,
+    p.link,
+    p.image_url,
+    sc.name AS sub_category_name,
+    c.name AS category_name,
+    offers.min_price,
+    offers.cheapest_store,
+    offers.offer_count,
+    offers.store_names,
+    setweight(to_tsvector('italian_unaccent', p.name), 'A')
+        || setweight(to_tsvector('italian_unaccent', sc.name), 'B')
+        || setweight(to_tsvector('italian_unaccent', c.name), 'C') AS search_document,
+    lower(unaccent(p.name)) AS search_name
+FROM (
+    SELECT
+        pp.product_id,
+        coalesce(l.location_id, 0) AS location_id,
+        l.city,
+        {store_name}
+        min(pp.price) AS min_price,
+        (array_agg(s.name ORDER BY pp.price, s.name))[1] AS cheapest_store,
+        count(*) AS offer_count,
+        array_agg(DISTINCT s.name) AS store_names
+    FROM product_prices pp
+    JOIN stores s ON s.store_id = pp.store_id
+    JOIN locations l ON l.location_id = pp.location_id
+    GROUP BY GROUPING SETS ({grouping})
+) offers
+JOIN products p ON p.product_id = offers.product_id
+JOIN sub_categories sc ON sc.sub_category_id = p.sub_category_id
+JOIN categories c ON c.category_id = sc.category_id
+WITH DATA
+"""
+
+
+def create_search_indexes():
+    op.execute("CREATE INDEX ix_product_catalog_search_document ON product_catalog USING gin (search_document)")
+    op.execute("CREATE INDEX ix_product_catalog_search_name ON product_catalog USING gin (search_name gin_trgm_ops)")
+
+
+def upgrade():
+    # With a store filter the listing shows that store's own price, not the cheapest overall
+    op.execute("DROP MATERIALIZED VIEW product_catalog")
+    op.execute(catalog_view(per_store=True))
+    op.execute(
+        "CREATE UNIQUE INDEX ix_product_catalog_product_location ON product_catalog "
+        "(product_id, location_id, store_name)"
+    )
+    op.execute(
+        "CREATE INDEX ix_product_catalog_location_price ON product_catalog "
+        "(location_id, store_name, min_price, product_id)"
+    )
+    create_search_indexes()
+
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW product_catalog")
+    op.execute(catalog_view(per_store=False))
+    op.execute("CREATE UNIQUE INDEX ix_product_catalog_product_location ON product_catalog (product_id, location_id)")
+    op.execute("CREATE INDEX ix_product_catalog_location_price ON product_catalog (location_id, min_price, product_id)")
+    create_search_indexes()
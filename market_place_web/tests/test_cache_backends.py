@@ -0,0 +1,67 @@
+"""
+Render locks of the in-memory page cache backend: one render per key under
+concurrent misses, and locks that survive page eviction.
+"""
+import importlib.util
+import os
+import threading
+import time
+
+# app/__init__.py needs Flask and a database; cache_backends.py needs neither
+spec = importlib.util.spec_from_file_location(
+    'cache_backends', os.path.join(os.path.dirname(__file__), '..', 'app', 'cache_backends.py')
+)
+cache_backends = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(cache_backends)
+
+
+def serve(backend, key, renders, results, start):
+    """What PageCache does per request: hit, wait for another render, or render once."""
+    start.wait()
+    entry = backend.get(key)
+    if entry is None:
+        entry, locked = cache_backends.wait_for_render(backend, key, lock_timeout=5, poll_interval=0.005)
+        if entry is None:
+            renders.append(key)
+            time.sleep(0.05)
+            entry = f"page {key}".encode('utf-8')
+            backend.set(key, entry, 60)
+            if locked:
+                backend.release(key)
+    results.append(entry)
+
+
+def test_concurrent_misses_render_each_key_once():
+    backend = cache_backends.LRUBackend()
+    renders, results = [], []
+    start = threading.Barrier(48)
+    threads = [
+        threading.Thread(target=serve, args=(backend, f"home:{i % 3}", renders, results, start))
+        for i in range(48)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(renders) == ['home:0', 'home:1', 'home:2']
+    assert sorted(set(results)) == [b'page home:0', b'page home:1', b'page home:2']
+    assert len(results) == 48
+
+
+def test_acquire_is_exclusive_until_release_or_expiry():
+    backend = cache_backends.LRUBackend()
+    assert backend.acquire('home:a', 60)
+    assert not backend.acquire('home:a', 60)
+    backend.release('home:a')
+    assert backend.acquire('home:a', 0.01)
+    time.sleep(0.02)
+    assert backend.acquire('home:a', 60)
+
+
+def test_page_eviction_keeps_held_locks():
+    backend = cache_backends.LRUBackend(max_entries=2, max_bytes=10)
+    assert backend.acquire('home:a', 60)
+    for i in range(10):
+        backend.set(f"home:{i}", b'12345', 60)
+    assert len(backend._entries) <= 2 and backend.size <= 10
+    assert not backend.acquire('home:a', 60)
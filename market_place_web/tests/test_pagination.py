@@ -0,0 +1,95 @@
+"""
+Keyset pagination over relevance-like keys: tied scores and values with no
+exact float representation must neither repeat nor skip rows.
+
+Runs on SQLite; set TEST_POSTGRES_URI to also run against PostgreSQL, where
+the score column is a float4 `real` like ts_rank_cd's result.
+"""
+import base64
+import importlib.util
+import json
+import os
+import pytest
+from sqlalchemy import Column, Float, Integer, REAL, MetaData, Table, cast, create_engine, select
+from sqlalchemy.orm import Session
+
+# app/__init__.py needs Flask and a database; pagination.py needs neither
+spec = importlib.util.spec_from_file_location(
+    'pagination', os.path.join(os.path.dirname(__file__), '..', 'app', 'pagination.py')
+)
+pagination = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pagination)
+
+URIS = ['sqlite://'] + ([os.environ['TEST_POSTGRES_URI']] if os.getenv('TEST_POSTGRES_URI') else [])
+
+
+@pytest.fixture(params=URIS)
+def catalog(request):
+    engine = create_engine(request.param)
+    metadata = MetaData()
+    table = Table(
+        'keyset_catalog', metadata,
+        Column('product_id', Integer, primary_key=True),
+        Column('rank', REAL, nullable=False),
+        Column('min_price', Float, nullable=False),
+    )
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [
+            # Few distinct scores (ties), none exactly representable in binary
+            {'product_id': i, 'rank': (i % 7) / 30 + 0.1, 'min_price': round(0.99 + (i % 5) * 1.1, 2)}
+            for i in range(1, 138)
+        ])
+    yield engine, table
+    metadata.drop_all(engine)
+    engine.dispose()
+
+
+def walk(session, query, order, direction, cursor, per_page):
+    """Every page's product ids, following cursors in `direction` from `cursor`."""
+    pages = []
+    while True:
+        page = pagination.KeysetPage(query, order, 'relevance:test', cursor, per_page)
+        pages.append(list(page.items))
+        cursor = page.next_cursor if direction == 'next' else page.prev_cursor
+        if cursor is None:
+            return pages, page
+
+
+@pytest.mark.parametrize('per_page', [1, 7, 20])
+def test_relevance_pages_neither_repeat_nor_skip(catalog, per_page):
+    engine, table = catalog
+    order = [
+        (cast(table.c.rank, Float(precision=53)), True),
+        (table.c.min_price, False),
+        (table.c.product_id, False),
+    ]
+    with Session(engine) as session:
+        # Items are the query's first entity: the product id here
+        query = session.query(table.c.product_id)
+        expected = [row.product_id for row in session.execute(
+            select(table).order_by(table.c.rank.desc(), table.c.min_price, table.c.product_id)
+        )]
+
+        forward, last = walk(session, query, order, 'next', None, per_page)
+        assert [product_id for page in forward for product_id in page] == expected
+
+        backward, _ = walk(session, query, order, 'prev', last.prev_cursor, per_page)
+        assert list(reversed(backward)) == forward[:-1]
+
+
+def test_unusable_cursor_starts_over(catalog):
+    engine, table = catalog
+    order = [(table.c.min_price, False), (table.c.product_id, False)]
+    with Session(engine) as session:
+        # Items are the query's first entity: the product id here
+        query = session.query(table.c.product_id)
+        first = pagination.KeysetPage(query, order, 'asc', None, 5)
+        other_sort = pagination.encode_cursor('desc', 'next', [1.0, 3])
+        # Hand-made tokens whose key is not a list of numbers of the right length
+        raw = [json.dumps(['asc', 'next', key]).encode('utf-8') for key in (5, ['a', 3], [True, 3], [1.0], None)]
+        forged = [base64.urlsafe_b64encode(token).decode('ascii') for token in raw]
+        for token in ['not-a-token', other_sort] + forged:
+            page = pagination.KeysetPage(query, order, 'asc', token, 5)
+            assert page.items == first.items